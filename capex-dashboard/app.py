@@ -10,13 +10,16 @@ Brewing Profit with Purpose.
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from datetime import datetime
 import json
 
 from config import (
-    STORE_LOCATIONS, STORE_ODOO_IDS, CAPEX_ACCOUNTS, COLORS, CHART_COLORS,
+    STORE_LOCATIONS, STORE_ODOO_IDS, CAPEX_ACCOUNTS, COLORS, COLORS_RGB, CHART_COLORS,
     TARGETS, SOURCING_ORIGINS, PRODUCT_CATEGORIES, DAYPARTS,
     APP_CONFIG, COLOR_POSITIVE, COLOR_NEGATIVE, COLOR_WARNING,
     ACCOUNT_MAP, ODOO_MODULES, ODOO_ID_TO_STORE, get_all_account_codes,
@@ -44,10 +47,10 @@ from kpi_engine import (
     calculate_impact_summary, calculate_executive_summary,
 )
 from components import (
-    metric_card, impact_card, progress_bar, section_header, badge,
+    metric_row, impact_row, section_header, badge,
     apply_brand_layout, waterfall_chart, gauge_chart, donut_chart,
     bar_chart, line_chart, area_chart, render_invoice_popup,
-    fmt_eur, fmt_pct, fmt_number,
+    fmt_eur, fmt_eur_series, fmt_pct, fmt_number,
 )
 
 
@@ -64,6 +67,21 @@ st.set_page_config(
 # Inject brand CSS
 st.markdown(get_brand_css(), unsafe_allow_html=True)
 
+# STORE_LOCATIONS as a frame, built once at import: tabs merge per-store
+# aggregates onto it instead of looping over the dict on every rerun.
+STORE_LOC_DF = (
+    pd.DataFrame.from_dict(STORE_LOCATIONS, orient='index')
+    .rename_axis('store_code').reset_index()
+)
+# Same for SOURCING_ORIGINS: the impact tab and its map read it column-wise.
+SOURCING_DF = pd.DataFrame(SOURCING_ORIGINS)
+# The store map's static geo columns: physical stores with coordinates only.
+STORE_MAP_DF = (
+    STORE_LOC_DF[(STORE_LOC_DF['store_code'] != "OOH") & STORE_LOC_DF['lat'].notna()]
+    .assign(sqm=lambda df: df['sqm'].fillna(0))
+    .reset_index(drop=True)
+)
+
 
 # ──────────────────────────────────────────────
 # SIDEBAR
@@ -235,6 +253,41 @@ def load_data(selected_years, selected_accounts):
     return demo
 
 
+# ──────────────────────────────────────────────
+# FILTER HELPERS
+# ──────────────────────────────────────────────
+def _filter_stores(df, store_filter):
+    """Return the rows of df whose store_code is in store_filter.
+
+    Builds a plain boolean ndarray mask (no index alignment). Categorical
+    store_code columns are matched on their small integer codes rather
+    than by hashing every string.
+    """
+    if df.empty:
+        return df
+    col = df['store_code']
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        keep = col.cat.categories.get_indexer(list(store_filter))
+        mask = np.isin(col.cat.codes.to_numpy(), keep[keep >= 0])
+    else:
+        mask = col.isin(store_filter).to_numpy()
+    return df[mask]
+
+
+def _group_sum(df, key, col):
+    """Sum df[col] per df[key] via factorize + np.bincount.
+
+    Same values as df.groupby(key, sort=False)[col].sum() (keys in order of
+    first appearance, NaN keys dropped) without pandas' groupby machinery;
+    meant for the single-column totals used as .map/.get lookups.
+    """
+    codes, uniques = pd.factorize(df[key])
+    valid = codes >= 0
+    sums = np.bincount(codes[valid], weights=df[col].to_numpy(dtype=np.float64)[valid],
+                       minlength=len(uniques))
+    return pd.Series(sums, index=pd.Index(np.asarray(uniques), name=key), name=col)
+
+
 # ──────────────────────────────────────────────
 # BUDGET HELPERS
 # ──────────────────────────────────────────────
@@ -248,6 +301,101 @@ def save_budgets(budgets):
     st.session_state.budgets = budgets
 
 
+# ──────────────────────────────────────────────
+# CACHED FIGURES
+# ──────────────────────────────────────────────
+# Figures whose aggregated inputs are unchanged between reruns (e.g. while
+# editing budgets) are reused instead of rebuilt. Streamlit hashes the
+# DataFrame arguments to key the cache; the returned Figure is shared, so
+# callers must pass it straight to st.plotly_chart without mutating it.
+
+@st.cache_resource(ttl=APP_CONFIG["cache_ttl_data"])
+def _customer_trend_fig(monthly_cust):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=monthly_cust['month'], y=monthly_cust['returning_customers'],
+                         name='Returning', marker_color=COLORS['teal']))
+    fig.add_trace(go.Bar(x=monthly_cust['month'], y=monthly_cust['new_customers'],
+                         name='New', marker_color=COLORS['orange']))
+    fig = apply_brand_layout(fig, height=350)
+    fig.update_layout(barmode='stack', yaxis_title="Customers")
+    return fig
+
+
+@st.cache_resource(ttl=APP_CONFIG["cache_ttl_data"])
+def _capex_per_store_fig(store_summary):
+    fig = go.Figure(go.Bar(
+        x=store_summary['amount'], y=store_summary['store_name'],
+        orientation='h',
+        marker=dict(color=store_summary['amount'],
+                    colorscale=[[0, COLORS['teal']], [1, COLORS['orange']]]),
+        text=fmt_eur_series(store_summary['amount']),
+        textposition='outside',
+    ))
+    return apply_brand_layout(fig, height=max(300, len(store_summary) * 28), show_legend=False)
+
+
+@st.cache_resource(ttl=APP_CONFIG["cache_ttl_data"])
+def _capex_account_bar_fig(account_summary):
+    fig = go.Figure(go.Bar(
+        x=account_summary['account_label'], y=account_summary['amount'],
+        marker_color=CHART_COLORS[:len(account_summary)],
+        text=fmt_eur_series(account_summary['amount']),
+        textposition='outside',
+    ))
+    fig = apply_brand_layout(fig, height=350, show_legend=False)
+    fig.update_layout(xaxis_tickangle=-20)
+    return fig
+
+
+@st.cache_resource
+def _sourcing_origins_fig():
+    """SOURCING_ORIGINS is static config, so the map is built once per process."""
+    fig = go.Figure(go.Scattergeo(
+        lat=SOURCING_DF['lat'], lon=SOURCING_DF['lon'],
+        mode='markers',
+        marker=dict(
+            size=SOURCING_DF['farmers'], sizemode='area',
+            sizeref=2 * SOURCING_DF['farmers'].max() / 30 ** 2,
+            color=SOURCING_DF['pct'],
+            colorscale=[[0, COLORS['teal']], [1, COLORS['orange']]],
+            showscale=True, colorbar=dict(title="Share"),
+        ),
+        text=SOURCING_DF['country'],
+        customdata=SOURCING_DF[['region', 'farmers', 'pct']].to_numpy(),
+        hovertemplate=('<b>%{text}</b><br>region=%{customdata[0]}<br>farmers=%{customdata[1]}'
+                       '<br>pct=%{customdata[2]:.0%}<extra></extra>'),
+    ))
+    fig.update_layout(
+        height=450,
+        geo=dict(
+            projection_type='natural earth',
+            showland=True, landcolor=COLORS['cream'],
+            showocean=True, oceancolor='#E3F2FD',
+            showcountries=True, countrycolor=COLORS['grey_light'],
+            lataxis=dict(range=[-35, 25]),
+            lonaxis=dict(range=[-100, 120]),
+        ),
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig
+
+
+# ──────────────────────────────────────────────
+# EXPORT HELPERS
+# ──────────────────────────────────────────────
+@st.cache_data(ttl=APP_CONFIG["cache_ttl_data"])
+def _csv_bytes(df):
+    """Encode a DataFrame as CSV bytes with Arrow's columnar writer.
+
+    Cached on the frame's hash, so reruns that don't change the filtered
+    data (every widget interaction) skip the encode entirely.
+    """
+    buf = pa.BufferOutputStream()
+    pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue().to_pybytes()
+
+
 # ──────────────────────────────────────────────
 # TAB: EXECUTIVE SUMMARY
 # ──────────────────────────────────────────────
@@ -259,12 +407,9 @@ def render_executive_tab(data, store_filter):
     investment_df = data['investment']
     impact_df = data['impact']
 
-    if not revenue_df.empty:
-        revenue_df = revenue_df[revenue_df['store_code'].isin(store_filter)]
-    if not cost_df.empty:
-        cost_df = cost_df[cost_df['store_code'].isin(store_filter)]
-    if not customer_df.empty:
-        customer_df = customer_df[customer_df['store_code'].isin(store_filter)]
+    revenue_df = _filter_stores(revenue_df, store_filter)
+    cost_df = _filter_stores(cost_df, store_filter)
+    customer_df = _filter_stores(customer_df, store_filter)
 
     summary = calculate_executive_summary(
         revenue_df, cost_df, customer_df, investment_df, impact_df, store_filter
@@ -309,22 +454,17 @@ def render_executive_tab(data, store_filter):
     """, unsafe_allow_html=True)
 
     # Primary KPI cards
-    c1, c2, c3, c4, c5, c6 = st.columns(6)
-    with c1:
-        metric_card("EBITDA", fmt_eur(summary['ebitda']), color="teal")
-    with c2:
-        metric_card("Gross Margin", fmt_pct(summary['gross_margin_pct']),
-                     delta=summary['gross_margin_pct'] - TARGETS['gross_margin_pct'] * 100,
-                     delta_suffix="% vs target", color="green")
-    with c3:
-        metric_card("Revenue Growth", fmt_pct(summary['growth_pct']),
-                     delta=summary['growth_pct'], delta_suffix="% (3mo)", color="orange")
-    with c4:
-        metric_card("Avg Ticket", f"\u20ac{summary['avg_transaction_value']:.2f}", color="yellow")
-    with c5:
-        metric_card("Active Stores", str(summary['active_stores']), color="teal")
-    with c6:
-        metric_card("Total Customers", fmt_number(summary['total_customers']), color="green")
+    metric_row([
+        dict(label="EBITDA", value=fmt_eur(summary['ebitda']), color="teal"),
+        dict(label="Gross Margin", value=fmt_pct(summary['gross_margin_pct']),
+             delta=summary['gross_margin_pct'] - TARGETS['gross_margin_pct'] * 100,
+             delta_suffix="% vs target", color="green"),
+        dict(label="Revenue Growth", value=fmt_pct(summary['growth_pct']),
+             delta=summary['growth_pct'], delta_suffix="% (3mo)", color="orange"),
+        dict(label="Avg Ticket", value=f"\u20ac{summary['avg_transaction_value']:.2f}", color="yellow"),
+        dict(label="Active Stores", value=str(summary['active_stores']), color="teal"),
+        dict(label="Total Customers", value=fmt_number(summary['total_customers']), color="green"),
+    ])
 
     st.markdown("")
 
@@ -362,17 +502,13 @@ def render_executive_tab(data, store_filter):
     section_header("Impact Spotlight", "How your coffee is making a difference")
     impact = calculate_impact_summary(impact_df)
     if impact:
-        i1, i2, i3, i4, i5 = st.columns(5)
-        with i1:
-            impact_card(f"{impact.get('current_farmers_supported', 0):,}", "Farmers Supported")
-        with i2:
-            impact_card(fmt_eur(impact.get('total_premium_paid', 0)), "Premium Paid to Farmers")
-        with i3:
-            impact_card(f"{impact.get('avg_direct_trade_pct', 0):.0f}", "Direct Trade", suffix="%")
-        with i4:
-            impact_card(f"{impact.get('total_cups_served', 0):,}", "Cups Served")
-        with i5:
-            impact_card(f"{impact.get('current_co2_per_cup', 0):.0f}g", "CO2 per Cup")
+        impact_row([
+            dict(number=f"{impact.get('current_farmers_supported', 0):,}", label="Farmers Supported"),
+            dict(number=fmt_eur(impact.get('total_premium_paid', 0)), label="Premium Paid to Farmers"),
+            dict(number=f"{impact.get('avg_direct_trade_pct', 0):.0f}", label="Direct Trade", suffix="%"),
+            dict(number=f"{impact.get('total_cups_served', 0):,}", label="Cups Served"),
+            dict(number=f"{impact.get('current_co2_per_cup', 0):.0f}g", label="CO2 per Cup"),
+        ])
 
 
 # ──────────────────────────────────────────────
@@ -384,46 +520,41 @@ def render_financial_tab(data, store_filter):
     cost_df = data['costs']
     investment_df = data['investment']
 
-    if not revenue_df.empty:
-        revenue_df = revenue_df[revenue_df['store_code'].isin(store_filter)]
-    if not cost_df.empty:
-        cost_df = cost_df[cost_df['store_code'].isin(store_filter)]
+    revenue_df = _filter_stores(revenue_df, store_filter)
+    cost_df = _filter_stores(cost_df, store_filter)
 
     # ROI Analysis
     section_header("Store ROI Analysis", "Return on investment per location")
 
     roi_df = calculate_store_roi(revenue_df, cost_df, investment_df)
     if not roi_df.empty:
-        roi_df = roi_df[roi_df['store_code'].isin(store_filter)]
+        roi_df = _filter_stores(roi_df, store_filter)
 
         # Summary cards
-        c1, c2, c3, c4 = st.columns(4)
-        with c1:
-            avg_roi = roi_df['roi_pct'].mean()
-            metric_card("Average ROI", fmt_pct(avg_roi), color="orange",
-                        tooltip="(Cumulative Net Profit / Total Investment) x 100")
-        with c2:
-            total_inv = roi_df['total_investment'].sum()
-            metric_card("Total Investment", fmt_eur(total_inv), color="teal")
-        with c3:
-            total_profit = roi_df['net_profit'].sum()
-            metric_card("Total Net Profit", fmt_eur(total_profit),
-                        delta=total_profit, delta_suffix="", color="green")
-        with c4:
-            best = roi_df.loc[roi_df['roi_pct'].idxmax()]
-            metric_card("Best Performer", f"{best['store_name']}",
-                        delta=best['roi_pct'], delta_suffix="% ROI", color="yellow")
+        avg_roi = roi_df['roi_pct'].mean()
+        total_inv = roi_df['total_investment'].sum()
+        total_profit = roi_df['net_profit'].sum()
+        best = roi_df.loc[roi_df['roi_pct'].idxmax()]
+        metric_row([
+            dict(label="Average ROI", value=fmt_pct(avg_roi), color="orange",
+                 tooltip="(Cumulative Net Profit / Total Investment) x 100"),
+            dict(label="Total Investment", value=fmt_eur(total_inv), color="teal"),
+            dict(label="Total Net Profit", value=fmt_eur(total_profit),
+                 delta=total_profit, delta_suffix="", color="green"),
+            dict(label="Best Performer", value=f"{best['store_name']}",
+                 delta=best['roi_pct'], delta_suffix="% ROI", color="yellow"),
+        ])
 
         st.markdown("")
 
         # ROI bar chart per store
         roi_sorted = roi_df.sort_values('roi_pct', ascending=True)
-        colors = [COLOR_POSITIVE if v >= 0 else COLOR_NEGATIVE for v in roi_sorted['roi_pct']]
+        colors = np.where(roi_sorted['roi_pct'].to_numpy() >= 0, COLOR_POSITIVE, COLOR_NEGATIVE).tolist()
 
         fig = go.Figure(go.Bar(
             x=roi_sorted['roi_pct'], y=roi_sorted['store_name'],
             orientation='h', marker_color=colors,
-            text=[f"{v:+.1f}%" for v in roi_sorted['roi_pct']],
+            texttemplate='%{x:+.1f}%',
             textposition='outside',
             hovertemplate='%{y}<br>ROI: %{x:.1f}%<extra></extra>',
         ))
@@ -439,7 +570,7 @@ def render_financial_tab(data, store_filter):
 
     be_df = calculate_break_even(revenue_df, cost_df, investment_df)
     if not be_df.empty:
-        be_df = be_df[be_df['store_code'].isin(store_filter)]
+        be_df = _filter_stores(be_df, store_filter)
         be_display = be_df[be_df['months_to_payback'].notna()].copy()
 
         if not be_display.empty:
@@ -447,12 +578,12 @@ def render_financial_tab(data, store_filter):
 
             with col1:
                 be_sorted = be_display.sort_values('months_to_payback')
-                colors_be = [COLOR_POSITIVE if m <= TARGETS['break_even_months'] else COLOR_WARNING
-                             for m in be_sorted['months_to_payback']]
+                colors_be = np.where(be_sorted['months_to_payback'].to_numpy() <= TARGETS['break_even_months'],
+                                     COLOR_POSITIVE, COLOR_WARNING).tolist()
                 fig = go.Figure(go.Bar(
                     x=be_sorted['store_name'], y=be_sorted['months_to_payback'],
                     marker_color=colors_be,
-                    text=[f"{m:.0f}mo" for m in be_sorted['months_to_payback']],
+                    texttemplate='%{y:.0f}mo',
                     textposition='outside',
                 ))
                 fig.add_hline(y=TARGETS['break_even_months'], line_dash="dash",
@@ -466,9 +597,9 @@ def render_financial_tab(data, store_filter):
                 # Contribution margin by store
                 fig = go.Figure(go.Bar(
                     x=be_display['store_name'],
-                    y=[cm * 100 for cm in be_display['contribution_margin']],
+                    y=be_display['contribution_margin'].to_numpy() * 100,
                     marker_color=CHART_COLORS[:len(be_display)],
-                    text=[f"{cm*100:.1f}%" for cm in be_display['contribution_margin']],
+                    texttemplate='%{y:.1f}%',
                     textposition='outside',
                 ))
                 fig = apply_brand_layout(fig, height=400, title="Contribution Margin by Store",
@@ -509,7 +640,8 @@ def render_financial_tab(data, store_filter):
         fig.add_trace(go.Bar(
             x=cf_df['month'], y=cf_df['operating_cash_flow'],
             name='Monthly Operating CF',
-            marker_color=[COLOR_POSITIVE if v >= 0 else COLOR_NEGATIVE for v in cf_df['operating_cash_flow']],
+            marker_color=np.where(cf_df['operating_cash_flow'].to_numpy() >= 0,
+                                  COLOR_POSITIVE, COLOR_NEGATIVE).tolist(),
         ))
         fig.add_trace(go.Scatter(
             x=cf_df['month'], y=cf_df['cumulative_cash_flow'],
@@ -529,34 +661,27 @@ def render_revenue_tab(data, store_filter):
     revenue_df = data['revenue']
     customer_df = data['customers']
 
-    if not revenue_df.empty:
-        revenue_df = revenue_df[revenue_df['store_code'].isin(store_filter)]
-    if not customer_df.empty:
-        customer_df = customer_df[customer_df['store_code'].isin(store_filter)]
-
-    rev_metrics = calculate_revenue_metrics(revenue_df, customer_df, store_filter)
-
-    if not rev_metrics:
+    revenue_df = _filter_stores(revenue_df, store_filter)
+    if revenue_df.empty:
         st.info("No revenue data available for the selected filters.")
         return
+    customer_df = _filter_stores(customer_df, store_filter)
+
+    rev_metrics = calculate_revenue_metrics(revenue_df, customer_df, store_filter)
 
     # KPI cards
-    c1, c2, c3, c4, c5 = st.columns(5)
-    with c1:
-        metric_card("Total Revenue", fmt_eur(rev_metrics['total_revenue']), color="orange")
-    with c2:
-        metric_card("Avg Monthly", fmt_eur(rev_metrics['avg_monthly_revenue']), color="teal")
-    with c3:
-        metric_card("Revenue/sqm/mo", f"\u20ac{rev_metrics['revenue_per_sqm_month']:,.0f}",
-                     delta=rev_metrics['revenue_per_sqm_month'] - TARGETS['revenue_per_sqm_month'],
-                     delta_suffix=" vs target", color="green")
-    with c4:
-        metric_card("Avg Ticket", f"\u20ac{rev_metrics['avg_transaction_value']:.2f}",
-                     delta=rev_metrics['avg_transaction_value'] - TARGETS['avg_transaction_value'],
-                     delta_suffix="", color="yellow")
-    with c5:
-        metric_card("3-Month Growth", fmt_pct(rev_metrics['growth_pct_3m']),
-                     delta=rev_metrics['growth_pct_3m'], delta_suffix="%", color="orange")
+    metric_row([
+        dict(label="Total Revenue", value=fmt_eur(rev_metrics['total_revenue']), color="orange"),
+        dict(label="Avg Monthly", value=fmt_eur(rev_metrics['avg_monthly_revenue']), color="teal"),
+        dict(label="Revenue/sqm/mo", value=f"\u20ac{rev_metrics['revenue_per_sqm_month']:,.0f}",
+             delta=rev_metrics['revenue_per_sqm_month'] - TARGETS['revenue_per_sqm_month'],
+             delta_suffix=" vs target", color="green"),
+        dict(label="Avg Ticket", value=f"\u20ac{rev_metrics['avg_transaction_value']:.2f}",
+             delta=rev_metrics['avg_transaction_value'] - TARGETS['avg_transaction_value'],
+             delta_suffix="", color="yellow"),
+        dict(label="3-Month Growth", value=fmt_pct(rev_metrics['growth_pct_3m']),
+             delta=rev_metrics['growth_pct_3m'], delta_suffix="%", color="orange"),
+    ])
 
     st.markdown("")
 
@@ -565,7 +690,7 @@ def render_revenue_tab(data, store_filter):
 
     with col1:
         section_header("Revenue by Category")
-        cat_data = revenue_df.groupby('category_label')['revenue'].sum().reset_index()
+        cat_data = revenue_df.groupby('category_label', sort=False)['revenue'].sum().reset_index()
         cat_data = cat_data.sort_values('revenue', ascending=False)
         fig = donut_chart(cat_data['category_label'].tolist(), cat_data['revenue'].tolist(),
                           height=350)
@@ -576,7 +701,7 @@ def render_revenue_tab(data, store_filter):
         ch_labels = {'dine_in': 'Dine-in', 'takeaway': 'Takeaway', 'delivery': 'Delivery', 'subscription': 'Subscription'}
         ch_data = revenue_df.copy()
         ch_data['channel_label'] = ch_data['channel'].map(ch_labels)
-        ch_summary = ch_data.groupby('channel_label')['revenue'].sum().reset_index()
+        ch_summary = ch_data.groupby('channel_label', sort=False)['revenue'].sum().reset_index()
         ch_summary = ch_summary.sort_values('revenue', ascending=False)
         fig = donut_chart(ch_summary['channel_label'].tolist(), ch_summary['revenue'].tolist(),
                           height=350)
@@ -586,14 +711,14 @@ def render_revenue_tab(data, store_filter):
     st.markdown("")
     section_header("Revenue by Store", "Monthly revenue performance ranked by total")
 
-    store_rev = revenue_df.groupby(['store_code', 'store_name'])['revenue'].sum().reset_index()
+    store_rev = revenue_df.groupby(['store_code', 'store_name'], sort=False)['revenue'].sum().reset_index()
     store_rev = store_rev.sort_values('revenue', ascending=True)
 
     fig = go.Figure(go.Bar(
         x=store_rev['revenue'], y=store_rev['store_name'],
         orientation='h',
         marker=dict(color=store_rev['revenue'], colorscale=[[0, COLORS['teal']], [1, COLORS['orange']]]),
-        text=[fmt_eur(v) for v in store_rev['revenue']],
+        text=fmt_eur_series(store_rev['revenue']),
         textposition='outside',
         hovertemplate='%{y}<br>\u20ac%{x:,.0f}<extra></extra>',
     ))
@@ -606,7 +731,6 @@ def render_revenue_tab(data, store_filter):
     section_header("Monthly Revenue by Category", "Stacked view of revenue composition over time")
 
     monthly_cat = revenue_df.groupby(['month', 'category_label'])['revenue'].sum().reset_index()
-    monthly_cat = monthly_cat.sort_values('month')
 
     fig = px.bar(monthly_cat, x='month', y='revenue', color='category_label',
                  color_discrete_sequence=CHART_COLORS, barmode='stack')
@@ -619,19 +743,16 @@ def render_revenue_tab(data, store_filter):
         st.markdown("")
         section_header("Customer Traffic by Daypart", "When are customers visiting?")
 
-        daypart_cols = [c for c in customer_df.columns if c.startswith('daypart_')]
-        if daypart_cols:
-            dp_means = {c.replace('daypart_', '').replace('_pct', '').replace('_', ' ').title():
-                        customer_df[c].mean() * 100 for c in daypart_cols}
-            dp_df = pd.DataFrame({'Daypart': list(dp_means.keys()), 'Share': list(dp_means.values())})
-
-            dp_colors = [COLORS['yellow'], COLORS['orange'], COLORS['teal'],
-                         COLORS['green'], COLORS['charcoal']]
+        # Dayparts in DAYPARTS order, with their configured labels and colors;
+        # all shares are averaged in one column-wise mean.
+        dp_keys = [k for k in DAYPARTS if f'daypart_{k}_pct' in customer_df.columns]
+        if dp_keys:
+            dp_share = customer_df[[f'daypart_{k}_pct' for k in dp_keys]].mean().to_numpy() * 100
 
             fig = go.Figure(go.Bar(
-                x=dp_df['Daypart'], y=dp_df['Share'],
-                marker_color=dp_colors[:len(dp_df)],
-                text=[f"{v:.1f}%" for v in dp_df['Share']],
+                x=[DAYPARTS[k]['label'] for k in dp_keys], y=dp_share,
+                marker_color=[DAYPARTS[k]['color'] for k in dp_keys],
+                texttemplate='%{y:.1f}%',
                 textposition='outside',
             ))
             fig = apply_brand_layout(fig, height=350, show_legend=False)
@@ -649,14 +770,10 @@ def render_cost_tab(data, store_filter):
     labor_df = data['labor']
     inventory_df = data['inventory']
 
-    if not revenue_df.empty:
-        revenue_df = revenue_df[revenue_df['store_code'].isin(store_filter)]
-    if not cost_df.empty:
-        cost_df = cost_df[cost_df['store_code'].isin(store_filter)]
-    if not labor_df.empty:
-        labor_df = labor_df[labor_df['store_code'].isin(store_filter)]
-    if not inventory_df.empty:
-        inventory_df = inventory_df[inventory_df['store_code'].isin(store_filter)]
+    revenue_df = _filter_stores(revenue_df, store_filter)
+    cost_df = _filter_stores(cost_df, store_filter)
+    labor_df = _filter_stores(labor_df, store_filter)
+    inventory_df = _filter_stores(inventory_df, store_filter)
 
     # Cost Structure
     section_header("Cost Structure", "All costs as percentage of revenue")
@@ -679,7 +796,7 @@ def render_cost_tab(data, store_filter):
                 y=cost_summary['cost_label'],
                 orientation='h',
                 marker_color=CHART_COLORS[:len(cost_summary)],
-                text=[f"{v:.1f}%" for v in cost_summary['pct_of_revenue']],
+                texttemplate='%{x:.1f}%',
                 textposition='outside',
             ))
             fig = apply_brand_layout(fig, height=380, show_legend=False)
@@ -692,7 +809,6 @@ def render_cost_tab(data, store_filter):
 
     if not cost_df.empty:
         monthly_costs = cost_df.groupby(['month', 'cost_label'])['amount'].sum().reset_index()
-        monthly_costs = monthly_costs.sort_values('month')
         fig = px.area(monthly_costs, x='month', y='amount', color='cost_label',
                       color_discrete_sequence=CHART_COLORS)
         fig = apply_brand_layout(fig, height=400)
@@ -705,24 +821,21 @@ def render_cost_tab(data, store_filter):
 
     labor_metrics = calculate_labor_efficiency(labor_df, store_filter)
     if labor_metrics:
-        c1, c2, c3, c4 = st.columns(4)
-        with c1:
-            metric_card("Revenue/Labor Hour", f"\u20ac{labor_metrics['revenue_per_labor_hour']:.0f}",
-                        delta=labor_metrics['revenue_per_labor_hour'] - TARGETS['revenue_per_labor_hour'],
-                        delta_suffix=" vs target", color="orange")
-        with c2:
-            metric_card("Labor Cost %", fmt_pct(labor_metrics['labor_cost_pct']),
-                        delta=-labor_metrics['vs_target'],
-                        delta_suffix="% vs target", color="teal")
-        with c3:
-            metric_card("Avg FTE/Store", f"{labor_metrics['avg_fte']:.1f}", color="green")
-        with c4:
-            metric_card("Rev/Employee/Mo", fmt_eur(labor_metrics['revenue_per_employee_month']), color="yellow")
+        metric_row([
+            dict(label="Revenue/Labor Hour", value=f"\u20ac{labor_metrics['revenue_per_labor_hour']:.0f}",
+                 delta=labor_metrics['revenue_per_labor_hour'] - TARGETS['revenue_per_labor_hour'],
+                 delta_suffix=" vs target", color="orange"),
+            dict(label="Labor Cost %", value=fmt_pct(labor_metrics['labor_cost_pct']),
+                 delta=-labor_metrics['vs_target'], delta_suffix="% vs target", color="teal"),
+            dict(label="Avg FTE/Store", value=f"{labor_metrics['avg_fte']:.1f}", color="green"),
+            dict(label="Rev/Employee/Mo", value=fmt_eur(labor_metrics['revenue_per_employee_month']),
+                 color="yellow"),
+        ])
 
         # Labor productivity by store
         if not labor_df.empty:
             st.markdown("")
-            store_labor = labor_df.groupby('store_name').agg({
+            store_labor = labor_df.groupby('store_name', sort=False).agg({
                 'revenue_per_labor_hour': 'mean',
                 'labor_cost_pct': 'mean',
             }).reset_index().sort_values('revenue_per_labor_hour', ascending=True)
@@ -732,7 +845,7 @@ def render_cost_tab(data, store_filter):
                 x=store_labor['revenue_per_labor_hour'], y=store_labor['store_name'],
                 orientation='h', name='Rev/Labor Hr',
                 marker_color=COLORS['orange'],
-                text=[f"\u20ac{v:.0f}" for v in store_labor['revenue_per_labor_hour']],
+                texttemplate='\u20ac%{x:.0f}',
                 textposition='outside',
             ))
             fig.add_vline(x=TARGETS['revenue_per_labor_hour'], line_dash="dash",
@@ -748,59 +861,59 @@ def render_cost_tab(data, store_filter):
 
     inv_metrics = calculate_inventory_metrics(inventory_df, cost_df, store_filter)
     if inv_metrics:
-        c1, c2, c3, c4 = st.columns(4)
-        with c1:
-            metric_card("Turnover Ratio", f"{inv_metrics['annualized_turnover']:.1f}x",
-                        delta=inv_metrics['annualized_turnover'] - TARGETS['inventory_turnover'],
-                        delta_suffix="x vs target", color="orange")
-        with c2:
-            metric_card("Avg Stock Value", fmt_eur(inv_metrics['avg_stock_value']), color="teal")
-        with c3:
-            metric_card("Waste Rate", fmt_pct(inv_metrics['waste_rate_pct']),
-                        delta=-inv_metrics['waste_rate_pct'], delta_suffix="%", color="green")
-        with c4:
-            metric_card("Days Inventory", f"{inv_metrics['days_inventory_outstanding']:.0f} days", color="yellow")
+        metric_row([
+            dict(label="Turnover Ratio", value=f"{inv_metrics['annualized_turnover']:.1f}x",
+                 delta=inv_metrics['annualized_turnover'] - TARGETS['inventory_turnover'],
+                 delta_suffix="x vs target", color="orange"),
+            dict(label="Avg Stock Value", value=fmt_eur(inv_metrics['avg_stock_value']), color="teal"),
+            dict(label="Waste Rate", value=fmt_pct(inv_metrics['waste_rate_pct']),
+                 delta=-inv_metrics['waste_rate_pct'], delta_suffix="%", color="green"),
+            dict(label="Days Inventory", value=f"{inv_metrics['days_inventory_outstanding']:.0f} days",
+                 color="yellow"),
+        ])
 
 
 # ──────────────────────────────────────────────
 # TAB: CUSTOMERS
 # ──────────────────────────────────────────────
+@st.fragment
 def render_customers_tab(data, store_filter):
     """Customer analytics: acquisition, retention, lifetime value."""
     customer_df = data['customers']
     cost_df = data['costs']
 
-    if not customer_df.empty:
-        customer_df = customer_df[customer_df['store_code'].isin(store_filter)]
-    if not cost_df.empty:
-        cost_df = cost_df[cost_df['store_code'].isin(store_filter)]
-
-    cust_metrics = calculate_customer_metrics(customer_df, cost_df, store_filter)
-
-    if not cust_metrics:
+    customer_df = _filter_stores(customer_df, store_filter)
+    if customer_df.empty:
         st.info("No customer data available for the selected filters.")
         return
+    cost_df = _filter_stores(cost_df, store_filter)
+
+    cust_metrics = calculate_customer_metrics(customer_df, cost_df, store_filter)
 
     section_header("Customer Overview", "Acquisition, retention, and lifetime value metrics")
 
-    c1, c2, c3, c4, c5 = st.columns(5)
-    with c1:
-        metric_card("Total Customers", fmt_number(cust_metrics['total_customers']), color="orange")
-    with c2:
-        metric_card("Retention Rate", fmt_pct(cust_metrics['avg_retention_rate'] * 100),
-                     delta=cust_metrics['avg_retention_rate'] * 100 - TARGETS['customer_retention_pct'] * 100,
-                     delta_suffix="% vs target", color="green")
-    with c3:
-        metric_card("CLV", f"\u20ac{cust_metrics['customer_lifetime_value']:.0f}", color="teal")
-    with c4:
-        metric_card("CAC", f"\u20ac{cust_metrics['customer_acquisition_cost']:.2f}", color="yellow")
-    with c5:
-        metric_card("CLV:CAC Ratio", f"{cust_metrics['clv_cac_ratio']:.1f}x",
-                     delta=cust_metrics['clv_cac_ratio'] - 3.0,
-                     delta_suffix="x vs 3x target", color="orange")
+    metric_row([
+        dict(label="Total Customers", value=fmt_number(cust_metrics['total_customers']), color="orange"),
+        dict(label="Retention Rate", value=fmt_pct(cust_metrics['avg_retention_rate'] * 100),
+             delta=cust_metrics['avg_retention_rate'] * 100 - TARGETS['customer_retention_pct'] * 100,
+             delta_suffix="% vs target", color="green"),
+        dict(label="CLV", value=f"\u20ac{cust_metrics['customer_lifetime_value']:.0f}", color="teal"),
+        dict(label="CAC", value=f"\u20ac{cust_metrics['customer_acquisition_cost']:.2f}", color="yellow"),
+        dict(label="CLV:CAC Ratio", value=f"{cust_metrics['clv_cac_ratio']:.1f}x",
+             delta=cust_metrics['clv_cac_ratio'] - 3.0, delta_suffix="x vs 3x target", color="orange"),
+    ])
 
     st.markdown("")
 
+    # Single pass over customer_df: the monthly trend and the per-store table
+    # below are both reduced from this small store x month frame. Means are
+    # carried as sum/count so the per-store averages stay row-weighted.
+    cust_grouped = customer_df.groupby(['store_name', 'month'], observed=True, sort=False)
+    mean_cols = ['avg_transaction_value', 'retention_rate']
+    cust_by_store_month = cust_grouped[
+        ['new_customers', 'returning_customers', 'unique_customers', 'total_transactions'] + mean_cols
+    ].sum().join(cust_grouped[mean_cols].count().add_suffix('_count'))
+
     col1, col2 = st.columns(2)
 
     with col1:
@@ -814,53 +927,46 @@ def render_customers_tab(data, store_filter):
 
     with col2:
         section_header("Customer Trend")
-        if not customer_df.empty:
-            monthly_cust = customer_df.groupby('month').agg({
-                'new_customers': 'sum',
-                'returning_customers': 'sum',
-            }).reset_index().sort_values('month')
+        monthly_cust = cust_by_store_month.groupby('month')[
+            ['new_customers', 'returning_customers']
+        ].sum().reset_index()
 
-            fig = go.Figure()
-            fig.add_trace(go.Bar(x=monthly_cust['month'], y=monthly_cust['returning_customers'],
-                                 name='Returning', marker_color=COLORS['teal']))
-            fig.add_trace(go.Bar(x=monthly_cust['month'], y=monthly_cust['new_customers'],
-                                 name='New', marker_color=COLORS['orange']))
-            fig = apply_brand_layout(fig, height=350)
-            fig.update_layout(barmode='stack', yaxis_title="Customers")
-            st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(_customer_trend_fig(monthly_cust), use_container_width=True)
 
     # Customer metrics by store
     st.markdown("")
     section_header("Customer Metrics by Store")
 
-    if not customer_df.empty:
-        store_cust = customer_df.groupby('store_name').agg({
-            'unique_customers': 'sum',
-            'avg_transaction_value': 'mean',
-            'retention_rate': 'mean',
-            'total_transactions': 'sum',
-        }).reset_index()
-        store_cust['visits_per_customer'] = (
-            store_cust['total_transactions'] / store_cust['unique_customers']
-        ).round(1)
+    store_totals = cust_by_store_month.groupby('store_name', sort=False).sum()
+    store_cust = pd.DataFrame({
+        'unique_customers': store_totals['unique_customers'],
+        'avg_transaction_value': (store_totals['avg_transaction_value']
+                                  / store_totals['avg_transaction_value_count']),
+        'retention_rate': store_totals['retention_rate'] / store_totals['retention_rate_count'],
+        'total_transactions': store_totals['total_transactions'],
+    }).reset_index()
+    store_cust['visits_per_customer'] = (
+        store_cust['total_transactions'] / store_cust['unique_customers']
+    ).round(1)
 
-        st.dataframe(
-            store_cust.sort_values('unique_customers', ascending=False),
-            use_container_width=True, hide_index=True,
-            column_config={
-                'store_name': 'Store',
-                'unique_customers': st.column_config.NumberColumn('Customers', format="%d"),
-                'avg_transaction_value': st.column_config.NumberColumn('Avg Ticket', format='\u20ac%.2f'),
-                'retention_rate': st.column_config.NumberColumn('Retention', format='%.1f%%'),
-                'total_transactions': st.column_config.NumberColumn('Transactions', format="%d"),
-                'visits_per_customer': st.column_config.NumberColumn('Visits/Customer', format="%.1f"),
-            },
-        )
+    st.dataframe(
+        store_cust.sort_values('unique_customers', ascending=False),
+        use_container_width=True, hide_index=True,
+        column_config={
+            'store_name': 'Store',
+            'unique_customers': st.column_config.NumberColumn('Customers', format="%d"),
+            'avg_transaction_value': st.column_config.NumberColumn('Avg Ticket', format='\u20ac%.2f'),
+            'retention_rate': st.column_config.NumberColumn('Retention', format='%.1f%%'),
+            'total_transactions': st.column_config.NumberColumn('Transactions', format="%d"),
+            'visits_per_customer': st.column_config.NumberColumn('Visits/Customer', format="%.1f"),
+        },
+    )
 
 
 # ──────────────────────────────────────────────
 # TAB: CAPEX TRACKING
 # ──────────────────────────────────────────────
+@st.fragment
 def render_capex_tab(data, store_filter, selected_accounts, selected_years):
     """Original CAPEX budget tracking with brand styling."""
     capex_df = data['capex']
@@ -873,7 +979,10 @@ def render_capex_tab(data, store_filter, selected_accounts, selected_years):
         st.info("No CAPEX data available for the selected criteria.")
         return
 
-    filtered_df = capex_df[capex_df['store_code'].isin(store_filter)]
+    filtered_df = _filter_stores(capex_df, store_filter)
+    if filtered_df.empty:
+        st.info("No CAPEX data available for the selected stores.")
+        return
 
     # Summary metrics
     section_header("CAPEX Overview", "Capital expenditure tracking across stores")
@@ -883,17 +992,14 @@ def render_capex_tab(data, store_filter, selected_accounts, selected_years):
     variance = total_budget - total_actual
     variance_pct = (variance / total_budget * 100) if total_budget > 0 else 0
 
-    c1, c2, c3, c4 = st.columns(4)
-    with c1:
-        metric_card("CAPEX Budget", fmt_eur(total_budget), color="teal")
-    with c2:
-        metric_card("Actual Spent", fmt_eur(total_actual), color="orange")
-    with c3:
-        metric_card("Variance", fmt_eur(variance),
-                     delta=variance_pct, delta_suffix="%", color="green" if variance >= 0 else "red")
-    with c4:
-        num_stores = filtered_df['store_code'].nunique()
-        metric_card("Active Stores", str(num_stores), color="yellow")
+    num_stores = filtered_df['store_code'].nunique()
+    metric_row([
+        dict(label="CAPEX Budget", value=fmt_eur(total_budget), color="teal"),
+        dict(label="Actual Spent", value=fmt_eur(total_actual), color="orange"),
+        dict(label="Variance", value=fmt_eur(variance),
+             delta=variance_pct, delta_suffix="%", color="green" if variance >= 0 else "red"),
+        dict(label="Active Stores", value=str(num_stores), color="yellow"),
+    ])
 
     st.markdown("")
 
@@ -901,23 +1007,14 @@ def render_capex_tab(data, store_filter, selected_accounts, selected_years):
 
     with col1:
         section_header("CAPEX per Store")
-        store_summary = filtered_df.groupby(['store_code', 'store_name'])['amount'].sum().reset_index()
+        store_summary = filtered_df.groupby(['store_code', 'store_name'], sort=False)['amount'].sum().reset_index()
         store_summary = store_summary.sort_values('amount', ascending=True)
 
-        fig = go.Figure(go.Bar(
-            x=store_summary['amount'], y=store_summary['store_name'],
-            orientation='h',
-            marker=dict(color=store_summary['amount'],
-                        colorscale=[[0, COLORS['teal']], [1, COLORS['orange']]]),
-            text=[fmt_eur(v) for v in store_summary['amount']],
-            textposition='outside',
-        ))
-        fig = apply_brand_layout(fig, height=max(300, len(store_summary) * 28), show_legend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(_capex_per_store_fig(store_summary), use_container_width=True)
 
     with col2:
         section_header("Monthly CAPEX Trend")
-        monthly = filtered_df.groupby('month')['amount'].sum().reset_index().sort_values('month')
+        monthly = filtered_df.groupby('month')['amount'].sum().reset_index()
         fig = area_chart(monthly, x='month', y='amount', height=max(300, len(store_summary) * 28),
                          color_sequence=[COLORS['orange']])
         st.plotly_chart(fig, use_container_width=True)
@@ -925,7 +1022,7 @@ def render_capex_tab(data, store_filter, selected_accounts, selected_years):
     # Account breakdown
     st.markdown("")
     section_header("CAPEX by Account Category")
-    account_summary = filtered_df.groupby('account_label')['amount'].sum().reset_index()
+    account_summary = filtered_df.groupby('account_label', sort=False)['amount'].sum().reset_index()
     account_summary = account_summary.sort_values('amount', ascending=False)
 
     col1, col2 = st.columns(2)
@@ -935,34 +1032,27 @@ def render_capex_tab(data, store_filter, selected_accounts, selected_years):
         st.plotly_chart(fig, use_container_width=True)
 
     with col2:
-        fig = go.Figure(go.Bar(
-            x=account_summary['account_label'], y=account_summary['amount'],
-            marker_color=CHART_COLORS[:len(account_summary)],
-            text=[fmt_eur(v) for v in account_summary['amount']],
-            textposition='outside',
-        ))
-        fig = apply_brand_layout(fig, height=350, show_legend=False)
-        fig.update_layout(xaxis_tickangle=-20)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(_capex_account_bar_fig(account_summary), use_container_width=True)
 
     # Budget vs Actual comparison
     st.markdown("")
     section_header("Budget vs Actual by Store")
 
-    comparison_data = []
-    for store_code in store_filter:
-        if store_code in STORE_LOCATIONS:
-            actual = filtered_df[filtered_df['store_code'] == store_code]['amount'].sum()
-            budget = budgets.get(budget_key, {}).get(store_code, 0)
-            if actual > 0 or budget > 0:
-                comparison_data.append({
-                    'Store': STORE_LOCATIONS[store_code]['name'],
-                    'Budget': budget, 'Actual': actual,
-                    'Variance': budget - actual,
-                })
-
-    if comparison_data:
-        comp_df = pd.DataFrame(comparison_data).sort_values('Actual', ascending=False)
+    comp_stores = _filter_stores(STORE_LOC_DF, store_filter)
+    budget_arr = comp_stores['store_code'].map(budgets.get(budget_key, {})).to_numpy(
+        dtype=np.float64, na_value=0.0)
+    actual_arr = comp_stores['store_code'].map(_group_sum(filtered_df, 'store_code', 'amount')).to_numpy(
+        dtype=np.float64, na_value=0.0)
+    keep = (actual_arr > 0) | (budget_arr > 0)
+    comp_df = pd.DataFrame({
+        'Store': comp_stores['name'].to_numpy()[keep],
+        'Budget': budget_arr[keep],
+        'Actual': actual_arr[keep],
+        'Variance': budget_arr[keep] - actual_arr[keep],
+    })
+
+    if not comp_df.empty:
+        comp_df = comp_df.sort_values('Actual', ascending=False)
         fig = go.Figure()
         fig.add_trace(go.Bar(name='Budget', x=comp_df['Store'], y=comp_df['Budget'],
                              marker_color=COLORS['grey_light']))
@@ -979,25 +1069,27 @@ def render_capex_tab(data, store_filter, selected_accounts, selected_years):
     if budget_key not in budgets:
         budgets[budget_key] = data.get('budgets', {}).copy()
 
-    col1, col2 = st.columns(2)
-    stores_list = [(c, i) for c, i in STORE_LOCATIONS.items()]
-    half = len(stores_list) // 2
-
-    with col1:
-        for code, info in stores_list[:half]:
-            current = budgets[budget_key].get(code, 0)
-            new_val = st.number_input(f"{info['name']} ({code})", min_value=0,
-                                       value=int(current), step=1000, key=f"budget_{code}")
-            budgets[budget_key][code] = new_val
-
-    with col2:
-        for code, info in stores_list[half:]:
-            current = budgets[budget_key].get(code, 0)
-            new_val = st.number_input(f"{info['name']} ({code})", min_value=0,
-                                       value=int(current), step=1000, key=f"budget_{code}")
-            budgets[budget_key][code] = new_val
-
-    bc1, bc2, bc3, bc4 = st.columns(4)
+    # Edits are batched in a form so typing into the inputs doesn't rerun
+    # the whole tab; values only apply when the form is submitted.
+    with st.form("capex_budgets"):
+        col1, col2 = st.columns(2)
+        current = budgets[budget_key]
+        half = len(STORE_LOCATIONS) // 2
+        new_vals = {}
+        for idx, (code, info) in enumerate(STORE_LOCATIONS.items()):
+            with (col1 if idx < half else col2):
+                new_vals[code] = st.number_input(f"{info['name']} ({code})", min_value=0,
+                                                  value=int(current.get(code, 0)), step=1000,
+                                                  key=f"budget_{code}")
+        current.update(new_vals)
+
+        submitted = st.form_submit_button("Save Budgets", type="primary", use_container_width=True)
+
+    if submitted:
+        save_budgets(budgets)
+        st.success("Budgets saved!")
+
+    bc1, bc2, bc3 = st.columns(3)
     with bc1:
         if st.button("Apply 50K Template", use_container_width=True):
             for code in STORE_LOCATIONS:
@@ -1015,10 +1107,6 @@ def render_capex_tab(data, store_filter, selected_accounts, selected_years):
             budgets[budget_key] = {}
             save_budgets(budgets)
             st.rerun()
-    with bc4:
-        if st.button("Save Budgets", type="primary", use_container_width=True):
-            save_budgets(budgets)
-            st.success("Budgets saved!")
 
     # Detailed transaction table
     st.markdown("")
@@ -1040,8 +1128,9 @@ def render_capex_tab(data, store_filter, selected_accounts, selected_years):
         section_header("Invoice Detail Viewer")
         moves = filtered_df[filtered_df['move_id'].notna()][['move_id', 'move_name']].drop_duplicates()
         if not moves.empty:
-            move_opts = {f"{r['move_name']} (ID: {int(r['move_id'])})": int(r['move_id'])
-                         for _, r in moves.iterrows() if r['move_id']}
+            move_opts = {f"{name} (ID: {int(mid)})": int(mid)
+                         for mid, name in zip(moves['move_id'].to_numpy(), moves['move_name'].to_numpy())
+                         if mid}
             if move_opts:
                 sel = st.selectbox("Select invoice/entry:", ["-- Select --"] + list(move_opts.keys()))
                 if sel != "-- Select --":
@@ -1049,9 +1138,8 @@ def render_capex_tab(data, store_filter, selected_accounts, selected_years):
                         render_invoice_popup(db, uid, password, move_opts[sel], sel)
 
     # CSV Export
-    csv = filtered_df.to_csv(index=False)
     years_str = '-'.join(str(y) for y in selected_years)
-    st.download_button("Download CAPEX CSV", data=csv,
+    st.download_button("Download CAPEX CSV", data=_csv_bytes(filtered_df),
                        file_name=f"wakuli_capex_{years_str}.csv", mime="text/csv")
 
 
@@ -1069,10 +1157,8 @@ def render_hr_tab(data, store_filter):
     data_sources = data.get('data_sources', {})
     labor_source = data_sources.get('labor', 'demo')
 
-    if not labor_df.empty:
-        labor_df = labor_df[labor_df['store_code'].isin(store_filter)]
-    if not revenue_df.empty:
-        revenue_df = revenue_df[revenue_df['store_code'].isin(store_filter)]
+    labor_df = _filter_stores(labor_df, store_filter)
+    revenue_df = _filter_stores(revenue_df, store_filter)
 
     # Source indicator
     if labor_source == 'nmbrs':
@@ -1087,35 +1173,29 @@ def render_hr_tab(data, store_filter):
 
     labor_metrics = calculate_labor_efficiency(labor_df, store_filter)
     if labor_metrics:
-        c1, c2, c3, c4, c5 = st.columns(5)
-        with c1:
-            total_headcount = labor_df['store_code'].nunique() if labor_df.empty else 0
-            # Calculate actual headcount from FTE data
-            if not labor_df.empty:
-                latest_month = labor_df[['year', 'month']].drop_duplicates().sort_values(
-                    ['year', 'month']).iloc[-1]
-                latest_labor = labor_df[
-                    (labor_df['year'] == latest_month['year']) &
-                    (labor_df['month'] == latest_month['month'])
-                ]
-                total_fte = latest_labor['fte_count'].sum()
-            else:
-                total_fte = 0
-            metric_card("Total FTE", f"{total_fte:.1f}", color="orange")
-        with c2:
-            metric_card("Total Labor Cost", fmt_eur(labor_metrics['total_labor_cost']),
-                        color="teal")
-        with c3:
-            metric_card("Labor Cost %", fmt_pct(labor_metrics['labor_cost_pct']),
-                        delta=-labor_metrics['vs_target'],
-                        delta_suffix="% vs target", color="green")
-        with c4:
-            metric_card("Rev/Labor Hour", f"\u20ac{labor_metrics['revenue_per_labor_hour']:.0f}",
-                        delta=labor_metrics['revenue_per_labor_hour'] - TARGETS['revenue_per_labor_hour'],
-                        delta_suffix=" vs target", color="yellow")
-        with c5:
-            metric_card("Rev/Employee/Mo", fmt_eur(labor_metrics['revenue_per_employee_month']),
-                        color="orange")
+        total_headcount = labor_df['store_code'].nunique() if labor_df.empty else 0
+        # Calculate actual headcount from FTE data
+        if not labor_df.empty:
+            latest_month = labor_df[['year', 'month']].drop_duplicates().sort_values(
+                ['year', 'month']).iloc[-1]
+            latest_labor = labor_df[
+                (labor_df['year'] == latest_month['year']) &
+                (labor_df['month'] == latest_month['month'])
+            ]
+            total_fte = latest_labor['fte_count'].sum()
+        else:
+            total_fte = 0
+        metric_row([
+            dict(label="Total FTE", value=f"{total_fte:.1f}", color="orange"),
+            dict(label="Total Labor Cost", value=fmt_eur(labor_metrics['total_labor_cost']), color="teal"),
+            dict(label="Labor Cost %", value=fmt_pct(labor_metrics['labor_cost_pct']),
+                 delta=-labor_metrics['vs_target'], delta_suffix="% vs target", color="green"),
+            dict(label="Rev/Labor Hour", value=f"\u20ac{labor_metrics['revenue_per_labor_hour']:.0f}",
+                 delta=labor_metrics['revenue_per_labor_hour'] - TARGETS['revenue_per_labor_hour'],
+                 delta_suffix=" vs target", color="yellow"),
+            dict(label="Rev/Employee/Mo", value=fmt_eur(labor_metrics['revenue_per_employee_month']),
+                 color="orange"),
+        ])
 
     if labor_df.empty:
         st.info("No labor data available for the selected stores.")
@@ -1136,7 +1216,7 @@ def render_hr_tab(data, store_filter):
                 (labor_df['year'] == latest_month['year']) &
                 (labor_df['month'] == latest_month['month'])
             ]
-            store_fte = latest_labor.groupby('store_name')['fte_count'].sum().reset_index()
+            store_fte = latest_labor.groupby('store_name', sort=False)['fte_count'].sum().reset_index()
             store_fte = store_fte.sort_values('fte_count', ascending=True)
 
             fig = go.Figure(go.Bar(
@@ -1144,7 +1224,7 @@ def render_hr_tab(data, store_filter):
                 orientation='h',
                 marker=dict(color=store_fte['fte_count'],
                             colorscale=[[0, COLORS['teal']], [1, COLORS['orange']]]),
-                text=[f"{v:.1f}" for v in store_fte['fte_count']],
+                texttemplate='%{x:.1f}',
                 textposition='outside',
             ))
             fig = apply_brand_layout(fig, height=max(300, len(store_fte) * 28), show_legend=False)
@@ -1154,7 +1234,7 @@ def render_hr_tab(data, store_filter):
     with col2:
         section_header("Monthly Labor Cost by Store", "Total employer cost per location")
         if not labor_df.empty:
-            store_cost = latest_labor.groupby('store_name')['labor_cost'].sum().reset_index()
+            store_cost = latest_labor.groupby('store_name', sort=False)['labor_cost'].sum().reset_index()
             store_cost = store_cost.sort_values('labor_cost', ascending=True)
 
             fig = go.Figure(go.Bar(
@@ -1162,7 +1242,7 @@ def render_hr_tab(data, store_filter):
                 orientation='h',
                 marker=dict(color=store_cost['labor_cost'],
                             colorscale=[[0, COLORS['orange']], [1, COLORS['red']]]),
-                text=[fmt_eur(v) for v in store_cost['labor_cost']],
+                text=fmt_eur_series(store_cost['labor_cost']),
                 textposition='outside',
             ))
             fig = apply_brand_layout(fig, height=max(300, len(store_cost) * 28), show_legend=False)
@@ -1186,7 +1266,7 @@ def render_hr_tab(data, store_filter):
     fig.add_trace(go.Bar(
         x=monthly_labor['period'], y=monthly_labor['total_cost'],
         name='Labor Cost', marker_color=COLORS['orange'],
-        text=[fmt_eur(v) for v in monthly_labor['total_cost']],
+        text=fmt_eur_series(monthly_labor['total_cost']),
         textposition='outside',
     ))
     fig.add_trace(go.Scatter(
@@ -1215,20 +1295,21 @@ def render_hr_tab(data, store_filter):
     col1, col2 = st.columns(2)
 
     with col1:
-        store_efficiency = labor_df.groupby('store_name').agg({
+        store_efficiency = labor_df.groupby('store_name', sort=False).agg({
             'revenue_per_labor_hour': 'mean',
         }).reset_index().sort_values('revenue_per_labor_hour', ascending=True)
 
-        colors = [COLOR_POSITIVE if v >= TARGETS['revenue_per_labor_hour']
-                  else COLOR_WARNING if v >= TARGETS['revenue_per_labor_hour'] * 0.8
-                  else COLOR_NEGATIVE
-                  for v in store_efficiency['revenue_per_labor_hour']]
+        rplh = store_efficiency['revenue_per_labor_hour'].to_numpy()
+        colors = np.select(
+            [rplh >= TARGETS['revenue_per_labor_hour'], rplh >= TARGETS['revenue_per_labor_hour'] * 0.8],
+            [COLOR_POSITIVE, COLOR_WARNING], default=COLOR_NEGATIVE,
+        ).tolist()
 
         fig = go.Figure(go.Bar(
             x=store_efficiency['revenue_per_labor_hour'], y=store_efficiency['store_name'],
             orientation='h',
             marker_color=colors,
-            text=[f"\u20ac{v:.0f}" for v in store_efficiency['revenue_per_labor_hour']],
+            texttemplate='\u20ac%{x:.0f}',
             textposition='outside',
         ))
         fig.add_vline(x=TARGETS['revenue_per_labor_hour'], line_dash="dash",
@@ -1239,23 +1320,24 @@ def render_hr_tab(data, store_filter):
         st.plotly_chart(fig, use_container_width=True)
 
     with col2:
-        store_labor_pct = labor_df.groupby('store_name').agg({
+        store_labor_pct = labor_df.groupby('store_name', sort=False).agg({
             'labor_cost_pct': 'mean',
         }).reset_index()
         store_labor_pct['labor_cost_pct'] = store_labor_pct['labor_cost_pct'] * 100
         store_labor_pct = store_labor_pct.sort_values('labor_cost_pct', ascending=True)
 
         target_pct = TARGETS['labor_cost_pct'] * 100
-        colors = [COLOR_POSITIVE if v <= target_pct
-                  else COLOR_WARNING if v <= target_pct * 1.1
-                  else COLOR_NEGATIVE
-                  for v in store_labor_pct['labor_cost_pct']]
+        labor_pct = store_labor_pct['labor_cost_pct'].to_numpy()
+        colors = np.select(
+            [labor_pct <= target_pct, labor_pct <= target_pct * 1.1],
+            [COLOR_POSITIVE, COLOR_WARNING], default=COLOR_NEGATIVE,
+        ).tolist()
 
         fig = go.Figure(go.Bar(
             x=store_labor_pct['labor_cost_pct'], y=store_labor_pct['store_name'],
             orientation='h',
             marker_color=colors,
-            text=[f"{v:.1f}%" for v in store_labor_pct['labor_cost_pct']],
+            texttemplate='%{x:.1f}%',
             textposition='outside',
         ))
         fig.add_vline(x=target_pct, line_dash="dash",
@@ -1275,7 +1357,7 @@ def render_hr_tab(data, store_filter):
         mode='lines+markers+text',
         line=dict(color=COLORS['orange'], width=3),
         marker=dict(size=8),
-        text=[f"{v:.1f}" for v in monthly_labor['total_fte']],
+        texttemplate='%{y:.1f}',
         textposition='top center',
         name='Total FTE',
     ))
@@ -1317,7 +1399,7 @@ def render_hr_tab(data, store_filter):
 
         emp_df = fetch_nmbrs_employees()
         if not emp_df.empty:
-            emp_df = emp_df[emp_df['store_code'].isin(store_filter)]
+            emp_df = _filter_stores(emp_df, store_filter)
 
             # Company breakdown
             if 'nmbrs_company' in emp_df.columns and emp_df['nmbrs_company'].nunique() > 1:
@@ -1365,6 +1447,7 @@ def render_hr_tab(data, store_filter):
 # ──────────────────────────────────────────────
 # TAB: IMPACT DASHBOARD
 # ──────────────────────────────────────────────
+@st.fragment
 def render_impact_tab(data):
     """Wakuli mission-aligned impact metrics and sourcing visualization."""
     impact_df = data['impact']
@@ -1392,35 +1475,38 @@ def render_impact_tab(data):
     """, unsafe_allow_html=True)
 
     # Impact KPIs
-    c1, c2, c3, c4, c5, c6 = st.columns(6)
-    with c1:
-        impact_card(f"{impact.get('current_farmers_supported', 0):,}", "Farmers Supported")
-    with c2:
-        impact_card(fmt_eur(impact.get('total_premium_paid', 0)), "Premium to Farmers")
-    with c3:
-        impact_card(f"{impact.get('avg_direct_trade_pct', 0):.0f}", "Direct Trade", suffix="%")
-    with c4:
-        impact_card(f"{impact.get('total_kg_sourced', 0):,.0f}", "KG Coffee Sourced")
-    with c5:
-        impact_card(f"{impact.get('avg_compostable_pct', 0):.0f}", "Compostable Pkg", suffix="%")
-    with c6:
-        impact_card(f"\u20ac{impact.get('premium_per_cup', 0):.3f}", "Premium Per Cup")
+    impact_row([
+        dict(number=f"{impact.get('current_farmers_supported', 0):,}", label="Farmers Supported"),
+        dict(number=fmt_eur(impact.get('total_premium_paid', 0)), label="Premium to Farmers"),
+        dict(number=f"{impact.get('avg_direct_trade_pct', 0):.0f}", label="Direct Trade", suffix="%"),
+        dict(number=f"{impact.get('total_kg_sourced', 0):,.0f}", label="KG Coffee Sourced"),
+        dict(number=f"{impact.get('avg_compostable_pct', 0):.0f}", label="Compostable Pkg", suffix="%"),
+        dict(number=f"\u20ac{impact.get('premium_per_cup', 0):.3f}", label="Premium Per Cup"),
+    ])
 
     st.markdown("")
 
+    # Pull the monthly series out once; every chart below plots against them.
+    monthly_impact = impact_df.sort_values('month')
+    months = monthly_impact['month'].to_numpy()
+    wakuli_price = monthly_impact['wakuli_price_per_kg'].to_numpy()
+    market_price = monthly_impact['market_price_per_kg'].to_numpy()
+    kg_sourced = monthly_impact['kg_coffee_sourced'].to_numpy()
+    co2_per_cup = monthly_impact['co2_per_cup_grams'].to_numpy()
+    compostable_pct = monthly_impact['compostable_packaging_pct'].to_numpy() * 100
+
     col1, col2 = st.columns(2)
 
     with col1:
         section_header("Farmer Premium Trend", "Price premium paid above market rate")
-        monthly_impact = impact_df.sort_values('month')
         fig = go.Figure()
         fig.add_trace(go.Scatter(
-            x=monthly_impact['month'], y=monthly_impact['wakuli_price_per_kg'],
+            x=months, y=wakuli_price,
             name='Wakuli Price', mode='lines+markers',
             line=dict(color=COLORS['orange'], width=3),
         ))
         fig.add_trace(go.Scatter(
-            x=monthly_impact['month'], y=monthly_impact['market_price_per_kg'],
+            x=months, y=market_price,
             name='Market Price', mode='lines+markers',
             line=dict(color=COLORS['grey_medium'], width=2, dash='dash'),
         ))
@@ -1431,9 +1517,9 @@ def render_impact_tab(data):
     with col2:
         section_header("Coffee Sourced Monthly", "KG of directly traded coffee")
         fig = go.Figure(go.Bar(
-            x=monthly_impact['month'], y=monthly_impact['kg_coffee_sourced'],
+            x=months, y=kg_sourced,
             marker_color=COLORS['green'],
-            text=[f"{v:,.0f}" for v in monthly_impact['kg_coffee_sourced']],
+            texttemplate='%{y:,.0f}',
             textposition='outside',
         ))
         fig = apply_brand_layout(fig, height=380, show_legend=False)
@@ -1444,36 +1530,11 @@ def render_impact_tab(data):
     st.markdown("")
     section_header("Coffee Sourcing Origins", "Where Wakuli coffee comes from")
 
-    origins_df = pd.DataFrame(SOURCING_ORIGINS)
-    fig = px.scatter_geo(
-        origins_df,
-        lat='lat', lon='lon',
-        size='farmers', color='pct',
-        hover_name='country',
-        hover_data={'region': True, 'farmers': True, 'pct': ':.0%',
-                    'lat': False, 'lon': False},
-        color_continuous_scale=[[0, COLORS['teal']], [1, COLORS['orange']]],
-        size_max=30,
-        projection='natural earth',
-    )
-    fig.update_layout(
-        height=450,
-        geo=dict(
-            showland=True, landcolor=COLORS['cream'],
-            showocean=True, oceancolor='#E3F2FD',
-            showcountries=True, countrycolor=COLORS['grey_light'],
-            lataxis=dict(range=[-35, 25]),
-            lonaxis=dict(range=[-100, 120]),
-        ),
-        margin=dict(l=0, r=0, t=0, b=0),
-        coloraxis_colorbar=dict(title="Share"),
-        paper_bgcolor='rgba(0,0,0,0)',
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(_sourcing_origins_fig(), use_container_width=True)
 
     # Sourcing table
     st.dataframe(
-        origins_df[['country', 'region', 'farmers', 'pct']].sort_values('pct', ascending=False),
+        SOURCING_DF[['country', 'region', 'farmers', 'pct']].sort_values('pct', ascending=False),
         use_container_width=True, hide_index=True,
         column_config={
             'country': 'Country', 'region': 'Region',
@@ -1489,9 +1550,9 @@ def render_impact_tab(data):
     col1, col2 = st.columns(2)
     with col1:
         fig = go.Figure(go.Scatter(
-            x=monthly_impact['month'], y=monthly_impact['co2_per_cup_grams'],
+            x=months, y=co2_per_cup,
             mode='lines+markers', line=dict(color=COLORS['green'], width=3),
-            fill='tozeroy', fillcolor=f"rgba(37, 161, 142, 0.15)",
+            fill='tozeroy', fillcolor="rgba({}, {}, {}, 0.15)".format(*COLORS_RGB['green']),
         ))
         fig = apply_brand_layout(fig, height=350, show_legend=False)
         fig.update_layout(yaxis_title="Grams CO2 per Cup", title=dict(text="CO2 per Cup Trend"))
@@ -1499,10 +1560,9 @@ def render_impact_tab(data):
 
     with col2:
         fig = go.Figure(go.Scatter(
-            x=monthly_impact['month'],
-            y=[p * 100 for p in monthly_impact['compostable_packaging_pct']],
+            x=months, y=compostable_pct,
             mode='lines+markers', line=dict(color=COLORS['teal'], width=3),
-            fill='tozeroy', fillcolor=f"rgba(0, 78, 100, 0.15)",
+            fill='tozeroy', fillcolor="rgba({}, {}, {}, 0.15)".format(*COLORS_RGB['teal']),
         ))
         fig = apply_brand_layout(fig, height=350, show_legend=False)
         fig.update_layout(yaxis_title="% Compostable", title=dict(text="Compostable Packaging"))
@@ -1512,6 +1572,7 @@ def render_impact_tab(data):
 # ──────────────────────────────────────────────
 # TAB: STORE MAP
 # ──────────────────────────────────────────────
+@st.fragment
 def render_map_tab(data, store_filter):
     """Interactive store map with performance overlay."""
     revenue_df = data['revenue']
@@ -1520,37 +1581,37 @@ def render_map_tab(data, store_filter):
 
     section_header("Store Locations", "Wakuli coffee bars across the Netherlands")
 
-    map_data = []
-    for code, info in STORE_LOCATIONS.items():
-        if code == "OOH" or 'lat' not in info:
-            continue
-        rev = revenue_df[revenue_df['store_code'] == code]['revenue'].sum() if not revenue_df.empty else 0
-        capex = capex_df[capex_df['store_code'] == code]['amount'].sum() if not capex_df.empty else 0
-        map_data.append({
-            'lat': info['lat'], 'lon': info['lon'],
-            'name': info['name'], 'code': code, 'city': info['city'],
-            'address': info['address'], 'sqm': info.get('sqm', 0),
-            'revenue': rev, 'capex': capex,
-            'size': max(rev / 5000, 12),
-        })
-
-    map_df = pd.DataFrame(map_data)
-
-    fig = px.scatter_mapbox(
-        map_df, lat='lat', lon='lon', size='size',
-        color='revenue', color_continuous_scale=[[0, COLORS['teal']], [1, COLORS['orange']]],
-        hover_name='name',
-        hover_data={
-            'city': True, 'address': True, 'sqm': True,
-            'revenue': ':\u20ac,.0f', 'capex': ':\u20ac,.0f',
-            'lat': False, 'lon': False, 'size': False,
-        },
-        zoom=6.5, center={'lat': 52.1, 'lon': 5.0},
+    rev_by_store = (_group_sum(revenue_df, 'store_code', 'revenue')
+                    if not revenue_df.empty else pd.Series(dtype=float))
+    capex_by_store = (_group_sum(capex_df, 'store_code', 'amount')
+                      if not capex_df.empty else pd.Series(dtype=float))
+
+    map_df = STORE_MAP_DF.assign(
+        revenue=STORE_MAP_DF['store_code'].map(rev_by_store).fillna(0),
+        capex=STORE_MAP_DF['store_code'].map(capex_by_store).fillna(0),
     )
+    map_df['size'] = (map_df['revenue'] / 5000).clip(lower=12)
+
+    fig = go.Figure(go.Scattermapbox(
+        lat=map_df['lat'], lon=map_df['lon'],
+        mode='markers',
+        marker=dict(
+            size=map_df['size'], sizemode='area',
+            sizeref=2 * map_df['size'].max() / 20 ** 2,
+            color=map_df['revenue'],
+            colorscale=[[0, COLORS['teal']], [1, COLORS['orange']]],
+            showscale=True, colorbar=dict(title="Revenue"),
+        ),
+        text=map_df['name'],
+        customdata=map_df[['city', 'address', 'sqm', 'revenue', 'capex']].to_numpy(),
+        hovertemplate=('<b>%{text}</b><br>city=%{customdata[0]}<br>address=%{customdata[1]}'
+                       '<br>sqm=%{customdata[2]}<br>revenue=\u20ac%{customdata[3]:,.0f}'
+                       '<br>capex=\u20ac%{customdata[4]:,.0f}<extra></extra>'),
+    ))
     fig.update_layout(
-        mapbox_style='carto-positron', height=550,
+        mapbox=dict(style='carto-positron', zoom=6.5, center={'lat': 52.1, 'lon': 5.0}),
+        height=550,
         margin={'r': 0, 't': 0, 'l': 0, 'b': 0},
-        coloraxis_colorbar=dict(title="Revenue"),
     )
     st.plotly_chart(fig, use_container_width=True)
 
@@ -1559,17 +1620,18 @@ def render_map_tab(data, store_filter):
     section_header("Store Directory")
 
     cols = st.columns(3)
+    rev_labels = fmt_eur_series(rev_by_store)
+    capex_labels = fmt_eur_series(capex_by_store)
+    zero_label = fmt_eur(0)
     store_items = [(c, i) for c, i in STORE_LOCATIONS.items() if c != "OOH"]
     for idx, (code, info) in enumerate(store_items):
         with cols[idx % 3]:
-            rev = revenue_df[revenue_df['store_code'] == code]['revenue'].sum() if not revenue_df.empty else 0
-            capex = capex_df[capex_df['store_code'] == code]['amount'].sum() if not capex_df.empty else 0
             st.markdown(f"""
             <div class="store-card">
                 <strong>{info['name']}</strong> ({code})<br>
                 <span style="font-size: 0.85rem; color: #666;">{info['address']}, {info['city']}</span><br>
-                <span class="store-amount">Revenue: {fmt_eur(rev)}</span> |
-                <span style="color: #004E64; font-weight: 600;">CAPEX: {fmt_eur(capex)}</span>
+                <span class="store-amount">Revenue: {rev_labels.get(code, zero_label)}</span> |
+                <span style="color: #004E64; font-weight: 600;">CAPEX: {capex_labels.get(code, zero_label)}</span>
             </div>
             """, unsafe_allow_html=True)
 
@@ -1577,6 +1639,7 @@ def render_map_tab(data, store_filter):
 # ──────────────────────────────────────────────
 # TAB: COMPARATIVE ANALYSIS
 # ──────────────────────────────────────────────
+@st.fragment
 def render_comparative_tab(data, store_filter, selected_years):
     """Store benchmarking and period-over-period comparison."""
     revenue_df = data['revenue']
@@ -1584,17 +1647,15 @@ def render_comparative_tab(data, store_filter, selected_years):
     customer_df = data['customers']
     labor_df = data['labor']
 
-    if not revenue_df.empty:
-        revenue_df = revenue_df[revenue_df['store_code'].isin(store_filter)]
-    if not cost_df.empty:
-        cost_df = cost_df[cost_df['store_code'].isin(store_filter)]
+    revenue_df = _filter_stores(revenue_df, store_filter)
+    cost_df = _filter_stores(cost_df, store_filter)
 
     # Store Performance Benchmarks
     section_header("Store Performance Ranking", "Compare stores across key metrics")
 
     prof_by_store = calculate_profitability_by_store(revenue_df, cost_df)
     if not prof_by_store.empty:
-        prof_by_store = prof_by_store[prof_by_store['store_code'].isin(store_filter)]
+        prof_by_store = _filter_stores(prof_by_store, store_filter)
 
         # Scorecard
         display = prof_by_store[['store_name', 'total_revenue', 'gross_margin_pct',
@@ -1621,12 +1682,12 @@ def render_comparative_tab(data, store_filter, selected_years):
         with col1:
             section_header("Gross Margin by Store")
             sorted_gm = prof_by_store.sort_values('gross_margin_pct', ascending=True)
-            colors_gm = [COLOR_POSITIVE if v >= TARGETS['gross_margin_pct'] * 100 else COLOR_WARNING
-                         for v in sorted_gm['gross_margin_pct']]
+            colors_gm = np.where(sorted_gm['gross_margin_pct'].to_numpy() >= TARGETS['gross_margin_pct'] * 100,
+                                 COLOR_POSITIVE, COLOR_WARNING).tolist()
             fig = go.Figure(go.Bar(
                 x=sorted_gm['gross_margin_pct'], y=sorted_gm['store_name'],
                 orientation='h', marker_color=colors_gm,
-                text=[f"{v:.1f}%" for v in sorted_gm['gross_margin_pct']],
+                texttemplate='%{x:.1f}%',
                 textposition='outside',
             ))
             fig.add_vline(x=TARGETS['gross_margin_pct'] * 100, line_dash="dash",
@@ -1638,12 +1699,12 @@ def render_comparative_tab(data, store_filter, selected_years):
         with col2:
             section_header("Net Margin by Store")
             sorted_nm = prof_by_store.sort_values('net_margin_pct', ascending=True)
-            colors_nm = [COLOR_POSITIVE if v >= TARGETS['net_margin_pct'] * 100 else COLOR_NEGATIVE
-                         for v in sorted_nm['net_margin_pct']]
+            colors_nm = np.where(sorted_nm['net_margin_pct'].to_numpy() >= TARGETS['net_margin_pct'] * 100,
+                                 COLOR_POSITIVE, COLOR_NEGATIVE).tolist()
             fig = go.Figure(go.Bar(
                 x=sorted_nm['net_margin_pct'], y=sorted_nm['store_name'],
                 orientation='h', marker_color=colors_nm,
-                text=[f"{v:.1f}%" for v in sorted_nm['net_margin_pct']],
+                texttemplate='%{x:.1f}%',
                 textposition='outside',
             ))
             fig.add_vline(x=TARGETS['net_margin_pct'] * 100, line_dash="dash",
@@ -1653,11 +1714,12 @@ def render_comparative_tab(data, store_filter, selected_years):
             st.plotly_chart(fig, use_container_width=True)
 
     # Year-over-Year comparison
-    if len(selected_years) > 1:
+    if len(selected_years) > 1 and not revenue_df.empty:
         st.markdown("")
         section_header("Year-over-Year Comparison", "How performance changed across years")
 
-        yearly_rev = revenue_df.groupby('year')['revenue'].sum().reset_index()
+        rev_by_year = _group_sum(revenue_df, 'year', 'revenue').sort_index()
+        yearly_rev = rev_by_year.reset_index()
         yearly_rev['year'] = yearly_rev['year'].astype(str)
 
         col1, col2 = st.columns(2)
@@ -1666,7 +1728,7 @@ def render_comparative_tab(data, store_filter, selected_years):
             fig = go.Figure(go.Bar(
                 x=yearly_rev['year'], y=yearly_rev['revenue'],
                 marker_color=CHART_COLORS[:len(yearly_rev)],
-                text=[fmt_eur(v) for v in yearly_rev['revenue']],
+                text=fmt_eur_series(yearly_rev['revenue']),
                 textposition='outside',
             ))
             fig = apply_brand_layout(fig, height=380, title="Revenue by Year", show_legend=False)
@@ -1674,9 +1736,14 @@ def render_comparative_tab(data, store_filter, selected_years):
 
         with col2:
             if not cost_df.empty:
-                yearly_costs = cost_df.groupby('year')['amount'].sum().reset_index()
-                yearly_costs['year'] = yearly_costs['year'].astype(str)
-                yearly_merged = yearly_rev.merge(yearly_costs, on='year', how='outer').fillna(0)
+                # Align the two per-year series on their index; no merge needed.
+                # _group_sum keeps first-appearance order, so sort by year (a
+                # year with costs but no revenue would otherwise land last).
+                cost_by_year = _group_sum(cost_df, 'year', 'amount').sort_index()
+                yearly_merged = pd.concat(
+                    [rev_by_year, cost_by_year], axis=1, keys=['revenue', 'amount'],
+                ).fillna(0).sort_index().rename_axis('year').reset_index()
+                yearly_merged['year'] = yearly_merged['year'].astype(str)
                 yearly_merged['profit'] = yearly_merged['revenue'] - yearly_merged['amount']
 
                 fig = go.Figure()
@@ -1687,7 +1754,7 @@ def render_comparative_tab(data, store_filter, selected_years):
                 fig.add_trace(go.Scatter(name='Profit', x=yearly_merged['year'],
                                           y=yearly_merged['profit'],
                                           mode='lines+markers+text',
-                                          text=[fmt_eur(v) for v in yearly_merged['profit']],
+                                          text=fmt_eur_series(yearly_merged['profit']),
                                           textposition='top center',
                                           line=dict(color=COLORS['green'], width=3)))
                 fig = apply_brand_layout(fig, height=380, title="Revenue vs Costs by Year")
@@ -1700,22 +1767,24 @@ def render_comparative_tab(data, store_filter, selected_years):
 
         if len(selected_years) >= 2:
             yr1, yr2 = sorted(selected_years)[-2], sorted(selected_years)[-1]
-            rev_yr1 = revenue_df[revenue_df['year'] == yr1].groupby('store_name')['revenue'].sum()
-            rev_yr2 = revenue_df[revenue_df['year'] == yr2].groupby('store_name')['revenue'].sum()
-
-            common_stores = set(rev_yr1.index) & set(rev_yr2.index)
-            if common_stores:
-                growth_data = []
-                for store in common_stores:
-                    g = ((rev_yr2[store] - rev_yr1[store]) / rev_yr1[store] * 100) if rev_yr1[store] > 0 else 0
-                    growth_data.append({'Store': store, 'Growth': g})
-                growth_df = pd.DataFrame(growth_data).sort_values('Growth', ascending=True)
-
-                colors_g = [COLOR_POSITIVE if v >= 0 else COLOR_NEGATIVE for v in growth_df['Growth']]
+            # Store x year pivot; dropna keeps only stores with revenue in both years
+            rev_pivot = revenue_df[revenue_df['year'].isin([yr1, yr2])].pivot_table(
+                index='store_name', columns='year', values='revenue', aggfunc='sum',
+            ).reindex(columns=[yr1, yr2]).dropna()
+
+            if not rev_pivot.empty:
+                rev_yr1 = rev_pivot[yr1].to_numpy()
+                rev_yr2 = rev_pivot[yr2].to_numpy()
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    growth = np.where(rev_yr1 > 0, (rev_yr2 - rev_yr1) / rev_yr1 * 100, 0)
+                growth_df = pd.DataFrame({'Store': rev_pivot.index, 'Growth': growth})
+                growth_df = growth_df.sort_values('Growth', ascending=True)
+
+                colors_g = np.where(growth_df['Growth'].to_numpy() >= 0, COLOR_POSITIVE, COLOR_NEGATIVE).tolist()
                 fig = go.Figure(go.Bar(
                     x=growth_df['Growth'], y=growth_df['Store'],
                     orientation='h', marker_color=colors_g,
-                    text=[f"{v:+.1f}%" for v in growth_df['Growth']],
+                    texttemplate='%{x:+.1f}%',
                     textposition='outside',
                 ))
                 fig.add_vline(x=0, line_color=COLORS['charcoal'], line_width=1)
@@ -1779,10 +1848,10 @@ def render_settings_tab(data, selected_years):
             for cat_key, entry in sec_entries.items():
                 rows.append({
                     'Category Key': cat_key,
-                    'Label': entry['label'],
-                    'Account Codes': ', '.join(entry['codes']),
-                    'Sign': entry.get('sign', 'abs'),
-                    'Group': entry.get('group', ''),
+                    'Label': entry.label,
+                    'Account Codes': ', '.join(entry.codes),
+                    'Sign': entry.sign,
+                    'Group': entry.group,
                 })
             if rows:
                 st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
@@ -2176,53 +2245,28 @@ def main():
         else:
             st.success(f"All data sourced from live systems: {'; '.join(live_parts)}.")
 
-    # Tabs
-    tabs = st.tabs([
-        "Executive Summary",
-        "Financial Deep Dive",
-        "Revenue Analytics",
-        "Cost & Efficiency",
-        "HR / Labor",
-        "Customers",
-        "CAPEX Tracking",
-        "Impact Dashboard",
-        "Store Map",
-        "Benchmarks",
-        "Settings",
-    ])
-
-    with tabs[0]:
-        render_executive_tab(data, store_filter)
-
-    with tabs[1]:
-        render_financial_tab(data, store_filter)
-
-    with tabs[2]:
-        render_revenue_tab(data, store_filter)
-
-    with tabs[3]:
-        render_cost_tab(data, store_filter)
-
-    with tabs[4]:
-        render_hr_tab(data, store_filter)
-
-    with tabs[5]:
-        render_customers_tab(data, store_filter)
-
-    with tabs[6]:
-        render_capex_tab(data, store_filter, selected_accounts, selected_years)
-
-    with tabs[7]:
-        render_impact_tab(data)
-
-    with tabs[8]:
-        render_map_tab(data, store_filter)
-
-    with tabs[9]:
-        render_comparative_tab(data, store_filter, selected_years)
+    # Views -- one st.tabs panel per entry. The tabs track the selected view
+    # (and mirror it in the ?view= URL parameter, so views are linkable), and
+    # only the open view's render function runs on each rerun.
+    views = {
+        "Executive Summary": lambda: render_executive_tab(data, store_filter),
+        "Financial Deep Dive": lambda: render_financial_tab(data, store_filter),
+        "Revenue Analytics": lambda: render_revenue_tab(data, store_filter),
+        "Cost & Efficiency": lambda: render_cost_tab(data, store_filter),
+        "HR / Labor": lambda: render_hr_tab(data, store_filter),
+        "Customers": lambda: render_customers_tab(data, store_filter),
+        "CAPEX Tracking": lambda: render_capex_tab(data, store_filter, selected_accounts, selected_years),
+        "Impact Dashboard": lambda: render_impact_tab(data),
+        "Store Map": lambda: render_map_tab(data, store_filter),
+        "Benchmarks": lambda: render_comparative_tab(data, store_filter, selected_years),
+        "Settings": lambda: render_settings_tab(data, selected_years),
+    }
+    tabs = st.tabs(list(views), key="view", on_change="rerun", bind="query-params")
 
-    with tabs[10]:
-        render_settings_tab(data, selected_years)
+    for tab, render_view in zip(tabs, views.values()):
+        with tab:
+            if tab.open:
+                render_view()
 
 
 if __name__ == "__main__":
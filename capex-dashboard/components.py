@@ -9,15 +9,31 @@ import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
+import numpy as np
 import base64
+from functools import partial
 import streamlit.components.v1 as html_components
-from config import COLORS, CHART_COLORS, COLOR_POSITIVE, COLOR_NEGATIVE, COLOR_WARNING
+from config import COLORS, CHART_COLORS, COLOR_POSITIVE, COLOR_NEGATIVE, COLOR_WARNING, APP_CONFIG
+from odoo_connector import fetch_invoice_details, fetch_invoice_pdf, many2one_part
 
 
 # ──────────────────────────────────────────────
 # METRIC CARDS
 # ──────────────────────────────────────────────
 
+# Card HTML templates. Kept on one line: blank lines inside a batched row
+# (metric_row / impact_row) would end the markdown HTML block and render the
+# remaining cards as code.
+_METRIC_CARD_TPL = (
+    '<div class="{card_class}"><div class="metric-label">{label}</div>'
+    '<div class="{value_class}">{prefix}{value}</div>{delta_html}{tooltip_html}</div>'
+)
+_METRIC_DELTA_TPL = '<div class="metric-delta {delta_class}">{arrow} {delta:+.1f}{delta_suffix}</div>'
+_IMPACT_CARD_TPL = (
+    '<div class="impact-card"><div class="impact-number">{number}{suffix}</div>'
+    '<div class="impact-label">{label}</div></div>'
+)
+
 def metric_card(label, value, delta=None, delta_suffix="", color="orange", prefix="", tooltip=None):
     """Render a branded metric card with optional delta indicator.
 
@@ -30,11 +46,18 @@ def metric_card(label, value, delta=None, delta_suffix="", color="orange", prefi
         prefix: Currency/unit prefix for value
         tooltip: Optional explanatory text
     """
+    st.markdown(_metric_card_html(label, value, delta, delta_suffix, color, prefix, tooltip),
+                unsafe_allow_html=True)
+
+
+def _metric_card_html(label, value, delta=None, delta_suffix="", color="orange", prefix="", tooltip=None):
+    """HTML for a single metric card (see metric_card for the arguments)."""
     delta_html = ""
     if delta is not None:
         delta_class = "positive" if delta >= 0 else "negative"
         arrow = "&#9650;" if delta >= 0 else "&#9660;"
-        delta_html = f'<div class="metric-delta {delta_class}">{arrow} {delta:+.1f}{delta_suffix}</div>'
+        delta_html = _METRIC_DELTA_TPL.format(delta_class=delta_class, arrow=arrow, delta=delta,
+                                              delta_suffix=delta_suffix)
 
     tooltip_html = ""
     if tooltip:
@@ -44,24 +67,39 @@ def metric_card(label, value, delta=None, delta_suffix="", color="orange", prefi
     value_class = f'metric-value {color_class}' if color_class else 'metric-value'
     card_class = f'metric-card {color_class}' if color_class else 'metric-card'
 
-    st.markdown(f"""
-    <div class="{card_class}">
-        <div class="metric-label">{label}</div>
-        <div class="{value_class}">{prefix}{value}</div>
-        {delta_html}
-        {tooltip_html}
-    </div>
-    """, unsafe_allow_html=True)
+    return _METRIC_CARD_TPL.format(
+        card_class=card_class, label=label, value_class=value_class, prefix=prefix, value=value,
+        delta_html=delta_html, tooltip_html=tooltip_html,
+    )
+
+
+def metric_row(cards):
+    """Render a row of metric cards with a single st.markdown call.
+
+    Args:
+        cards: list of dicts of metric_card keyword arguments
+    """
+    html = ''.join(_metric_card_html(**card) for card in cards)
+    st.markdown(f'<div class="metric-row">{html}</div>', unsafe_allow_html=True)
 
 
 def impact_card(number, label, suffix=""):
     """Render a mission-aligned impact card (dark background, gold numbers)."""
-    st.markdown(f"""
-    <div class="impact-card">
-        <div class="impact-number">{number}{suffix}</div>
-        <div class="impact-label">{label}</div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_impact_card_html(number, label, suffix), unsafe_allow_html=True)
+
+
+def _impact_card_html(number, label, suffix=""):
+    return _IMPACT_CARD_TPL.format(number=number, suffix=suffix, label=label)
+
+
+def impact_row(cards):
+    """Render a row of impact cards with a single st.markdown call.
+
+    Args:
+        cards: list of dicts of impact_card keyword arguments
+    """
+    html = ''.join(_impact_card_html(**card) for card in cards)
+    st.markdown(f'<div class="metric-row">{html}</div>', unsafe_allow_html=True)
 
 
 def progress_bar(value, max_value, label="", color="orange"):
@@ -95,27 +133,39 @@ def badge(text, status="good"):
 # ──────────────────────────────────────────────
 # CHART HELPERS
 # ──────────────────────────────────────────────
+# The chart builders below are memoized with st.cache_data, keyed on their
+# (DataFrame / list) inputs, so unchanged charts are not rebuilt on every
+# rerun. st.cache_data hands back a fresh copy per call, so callers can keep
+# tweaking the returned figure with update_layout / add_vline etc.
+
+# Static part of the brand layout, built once at import; apply_brand_layout
+# only adds the per-figure height / title / legend / margin on top.
+_BRAND_LAYOUT_STATIC = dict(
+    font=dict(family="Poppins", color=COLORS['charcoal']),
+    paper_bgcolor='rgba(0,0,0,0)',
+    plot_bgcolor='rgba(0,0,0,0)',
+    legend=dict(font=dict(size=11)),
+    xaxis=dict(gridcolor=COLORS['grey_light'], showgrid=True, zeroline=False),
+    yaxis=dict(gridcolor=COLORS['grey_light'], showgrid=True, zeroline=False),
+)
+
 
 def apply_brand_layout(fig, height=400, title=None, show_legend=True):
     """Apply Wakuli brand styling to any Plotly figure."""
     fig.update_layout(
         height=height,
         title=dict(text=title, font=dict(family="Poppins", size=16, color=COLORS['charcoal'])) if title else None,
-        font=dict(family="Poppins", color=COLORS['charcoal']),
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
         showlegend=show_legend,
-        legend=dict(font=dict(size=11)),
         margin=dict(l=40, r=20, t=50 if title else 20, b=40),
-        xaxis=dict(gridcolor=COLORS['grey_light'], showgrid=True, zeroline=False),
-        yaxis=dict(gridcolor=COLORS['grey_light'], showgrid=True, zeroline=False),
+        **_BRAND_LAYOUT_STATIC,
     )
     return fig
 
 
+@st.cache_data(ttl=APP_CONFIG["cache_ttl_data"], show_spinner=False)
 def waterfall_chart(categories, values, title=None, height=400):
     """Create a waterfall chart for P&L / cost breakdown."""
-    colors = [COLOR_POSITIVE if v >= 0 else COLOR_NEGATIVE for v in values]
+    abs_values = np.abs(np.asarray(values, dtype=np.float64))
 
     fig = go.Figure(go.Waterfall(
         x=categories,
@@ -125,15 +175,22 @@ def waterfall_chart(categories, values, title=None, height=400):
         decreasing=dict(marker=dict(color=COLOR_NEGATIVE)),
         totals=dict(marker=dict(color=COLORS['orange'])),
         textposition="outside",
-        text=[f"\u20ac{abs(v):,.0f}" for v in values],
+        text=[f"\u20ac{v:,.0f}" for v in abs_values.tolist()],
     ))
 
     return apply_brand_layout(fig, height=height, title=title, show_legend=False)
 
 
+# Gauge bar color by attainment: below 90% of target, within 90%, at/above target
+_GAUGE_COLORS = (COLOR_NEGATIVE, COLOR_WARNING, COLOR_POSITIVE)
+
+
+@st.cache_data(ttl=APP_CONFIG["cache_ttl_data"], show_spinner=False)
 def gauge_chart(value, target, title, suffix="%", min_val=0, max_val=100):
     """Create a gauge chart for KPI vs target."""
-    color = COLOR_POSITIVE if value >= target else (COLOR_WARNING if value >= target * 0.9 else COLOR_NEGATIVE)
+    # Meeting the target wins outright: for a negative target, 90% of it is
+    # above the target itself, so the two checks can't simply be summed.
+    color = _GAUGE_COLORS[2 if value >= target else int(value >= target * 0.9)]
 
     fig = go.Figure(go.Indicator(
         mode="gauge+number+delta",
@@ -163,24 +220,45 @@ def gauge_chart(value, target, title, suffix="%", min_val=0, max_val=100):
     return fig
 
 
+_DONUT_HOVER = '%{label}<br>\u20ac%{value:,.0f}<br>%{percent}<extra></extra>'
+
+
+@st.cache_data(ttl=APP_CONFIG["cache_ttl_data"], show_spinner=False)
 def donut_chart(labels, values, title=None, height=350):
     """Create a branded donut chart."""
     fig = go.Figure(go.Pie(
         labels=labels,
         values=values,
         hole=0.55,
-        marker=dict(colors=CHART_COLORS[:len(labels)]),
+        marker=dict(colors=CHART_COLORS),
         textinfo='percent+label',
         textfont=dict(size=11, family="Poppins"),
-        hovertemplate='%{label}<br>\u20ac%{value:,.0f}<br>%{percent}<extra></extra>',
+        hovertemplate=_DONUT_HOVER,
     ))
 
     return apply_brand_layout(fig, height=height, title=title, show_legend=False)
 
 
+def _chart_frame(df, x, y, color=None):
+    """Narrow df to the columns a px chart actually plots.
+
+    The cached builders below hash their DataFrame argument on every call,
+    so handing them only x / y / color keeps the cache key small for wide
+    frames and keeps unused columns out of Plotly's column extraction.
+    """
+    cols = [x] + (list(y) if isinstance(y, (list, tuple)) else [y]) + ([color] if color else [])
+    return df[list(dict.fromkeys(cols))]
+
+
 def bar_chart(df, x, y, color=None, title=None, height=400, orientation='v',
               color_sequence=None, barmode='group', text_auto=False):
     """Create a branded bar chart."""
+    return _bar_chart(_chart_frame(df, x, y, color), x, y, color, title, height, orientation,
+                      color_sequence, barmode, text_auto)
+
+
+@st.cache_data(ttl=APP_CONFIG["cache_ttl_data"], show_spinner=False)
+def _bar_chart(df, x, y, color, title, height, orientation, color_sequence, barmode, text_auto):
     colors = color_sequence or CHART_COLORS
 
     fig = px.bar(
@@ -193,6 +271,11 @@ def bar_chart(df, x, y, color=None, title=None, height=400, orientation='v',
 
 def line_chart(df, x, y, color=None, title=None, height=400, color_sequence=None):
     """Create a branded line/area chart."""
+    return _line_chart(_chart_frame(df, x, y, color), x, y, color, title, height, color_sequence)
+
+
+@st.cache_data(ttl=APP_CONFIG["cache_ttl_data"], show_spinner=False)
+def _line_chart(df, x, y, color, title, height, color_sequence):
     colors = color_sequence or CHART_COLORS
 
     fig = px.line(
@@ -206,6 +289,11 @@ def line_chart(df, x, y, color=None, title=None, height=400, color_sequence=None
 
 def area_chart(df, x, y, color=None, title=None, height=400, color_sequence=None):
     """Create a branded area chart."""
+    return _area_chart(_chart_frame(df, x, y, color), x, y, color, title, height, color_sequence)
+
+
+@st.cache_data(ttl=APP_CONFIG["cache_ttl_data"], show_spinner=False)
+def _area_chart(df, x, y, color, title, height, color_sequence):
     colors = color_sequence or CHART_COLORS
 
     fig = px.area(
@@ -220,11 +308,43 @@ def area_chart(df, x, y, color=None, title=None, height=400, color_sequence=None
 # INVOICE / DETAIL VIEWS
 # ──────────────────────────────────────────────
 
-def render_invoice_popup(db, uid, password, move_id, move_name):
-    """Render invoice detail view inside an expander."""
-    from odoo_connector import fetch_invoice_details, fetch_invoice_pdf
+# Odoo account.move move_type -> display label
+_MOVE_TYPE_LABELS = {
+    'out_invoice': 'Customer Invoice', 'in_invoice': 'Vendor Bill',
+    'out_refund': 'Credit Note', 'in_refund': 'Vendor Credit', 'entry': 'Journal Entry',
+}
+
+_INVOICE_LINE_COLUMN_CONFIG = {
+    'Debit': st.column_config.NumberColumn(format='\u20ac%.2f'),
+    'Credit': st.column_config.NumberColumn(format='\u20ac%.2f'),
+    'Unit Price': st.column_config.NumberColumn(format='\u20ac%.2f'),
+}
+
 
+def _load_invoice(db, uid, password, move_id):
+    """Fetch an invoice and its PDF attachment.
+
+    Returns (move, lines, pdf_name, pdf_b64); the PDF fields are None when
+    the move has no PDF attachment. The PDF is kept base64-encoded only --
+    it is decoded on demand when the user downloads it. Not cached itself:
+    fetch_invoice_details and fetch_invoice_pdf are already cached per
+    move_id with the data TTL.
+    """
     move, lines = fetch_invoice_details(db, uid, password, move_id)
+    if not move:
+        return move, lines, None, None
+
+    pdf_data = fetch_invoice_pdf(db, uid, password, move_id)
+    if not pdf_data or not pdf_data.get('datas'):
+        return move, lines, None, None
+
+    return move, lines, pdf_data.get('name'), pdf_data['datas']
+
+
+@st.fragment
+def render_invoice_popup(db, uid, password, move_id, move_name):
+    """Render invoice detail view inside an expander."""
+    move, lines, pdf_name, pdf_b64 = _load_invoice(db, uid, password, move_id)
 
     if not move:
         st.warning("Could not load invoice details.")
@@ -241,11 +361,8 @@ def render_invoice_popup(db, uid, password, move_id, move_name):
         st.markdown(f"**Due:** {move.get('invoice_date_due', 'N/A')}")
     with cols[2]:
         st.markdown(f"**State:** {move.get('state', 'N/A')}")
-        type_labels = {
-            'out_invoice': 'Customer Invoice', 'in_invoice': 'Vendor Bill',
-            'out_refund': 'Credit Note', 'in_refund': 'Vendor Credit', 'entry': 'Journal Entry',
-        }
-        st.markdown(f"**Type:** {type_labels.get(move.get('move_type', ''), move.get('move_type', ''))}")
+        move_type = move.get('move_type', '')
+        st.markdown(f"**Type:** {_MOVE_TYPE_LABELS.get(move_type, move_type)}")
     with cols[3]:
         total = move.get('amount_total', 0)
         st.metric("Total", f"\u20ac{total:,.2f}")
@@ -255,42 +372,40 @@ def render_invoice_popup(db, uid, password, move_id, move_name):
         st.markdown(f"**Reference:** {ref}")
 
     if lines:
-        line_data = []
-        for l in lines:
-            acc = l.get('account_id', [None, ''])
-            acc_name = acc[1] if isinstance(acc, list) and len(acc) > 1 else str(acc)
-            prod = l.get('product_id', [None, ''])
-            prod_name = prod[1] if isinstance(prod, list) and len(prod) > 1 else ''
-            line_data.append({
-                'Account': acc_name, 'Description': l.get('name', ''),
-                'Product': prod_name, 'Qty': l.get('quantity', 0),
-                'Unit Price': l.get('price_unit', 0),
-                'Debit': l.get('debit', 0), 'Credit': l.get('credit', 0),
-            })
+        # Odoo returns many2one fields as [id, name] (or False); pick the name
+        # column-wise. (.str[1] raises when a column is all False, e.g. a
+        # journal entry without products.)
+        line_df = pd.DataFrame.from_records(lines).reindex(columns=[
+            'account_id', 'name', 'product_id', 'quantity', 'price_unit', 'debit', 'credit',
+        ])
+        line_df['account_id'] = many2one_part(line_df['account_id'], 1).fillna(line_df['account_id'].astype(str))
+        line_df['product_id'] = many2one_part(line_df['product_id'], 1).fillna('')
+        line_df[['quantity', 'price_unit', 'debit', 'credit']] = (
+            line_df[['quantity', 'price_unit', 'debit', 'credit']].fillna(0)
+        )
+        line_df = line_df.rename(columns={
+            'account_id': 'Account', 'name': 'Description', 'product_id': 'Product',
+            'quantity': 'Qty', 'price_unit': 'Unit Price', 'debit': 'Debit', 'credit': 'Credit',
+        })
         st.dataframe(
-            pd.DataFrame(line_data), use_container_width=True, hide_index=True,
-            column_config={
-                'Debit': st.column_config.NumberColumn(format='\u20ac%.2f'),
-                'Credit': st.column_config.NumberColumn(format='\u20ac%.2f'),
-                'Unit Price': st.column_config.NumberColumn(format='\u20ac%.2f'),
-            },
+            line_df, use_container_width=True, hide_index=True,
+            column_config=_INVOICE_LINE_COLUMN_CONFIG,
         )
 
-    pdf_data = fetch_invoice_pdf(db, uid, password, move_id)
-    if pdf_data and pdf_data.get('datas'):
+    if pdf_b64:
         st.divider()
-        st.markdown(f"**Attachment:** {pdf_data.get('name', 'document.pdf')}")
-        pdf_bytes = base64.b64decode(pdf_data['datas'])
+        st.markdown(f"**Attachment:** {pdf_name or 'document.pdf'}")
         st.download_button(
-            label="Download PDF", data=pdf_bytes,
-            file_name=pdf_data.get('name', 'invoice.pdf'),
+            label="Download PDF", data=partial(base64.b64decode, pdf_b64),
+            file_name=pdf_name or 'invoice.pdf',
             mime='application/pdf', key=f"pdf_dl_{move_id}",
         )
-        b64 = pdf_data['datas']
+        # Build a Blob URL in the browser: a data: URI in the src breaks
+        # once it exceeds the browser's URL length cap (2 MB in Chromium).
         pdf_html = f"""
         <iframe id="pdfViewer_{move_id}" width="100%" height="580" style="border:none;"></iframe>
         <script>
-            const b64 = "{b64}";
+            const b64 = "{pdf_b64}";
             const byteChars = atob(b64);
             const byteNums = new Uint8Array(byteChars.length);
             for (let i = 0; i < byteChars.length; i++) {{ byteNums[i] = byteChars.charCodeAt(i); }}
@@ -305,13 +420,34 @@ def render_invoice_popup(db, uid, password, move_id, move_name):
 # FORMAT HELPERS
 # ──────────────────────────────────────────────
 
+# Magnitude tables shared by fmt_eur / fmt_number / fmt_eur_series:
+# index 0 = units, 1 = thousands, 2 = millions.
+_MAGNITUDE_DIVISORS = (1, 1_000, 1_000_000)
+_MAGNITUDE_SUFFIXES = ('', 'K', 'M')
+
+
+def _magnitude(value):
+    """Return the magnitude table index (0, 1 or 2) for a scalar."""
+    abs_value = abs(value)
+    return int(abs_value >= 1_000) + int(abs_value >= 1_000_000)
+
+
 def fmt_eur(value, decimals=0):
     """Format a number as EUR currency."""
-    if abs(value) >= 1_000_000:
-        return f"\u20ac{value/1_000_000:,.{decimals}f}M"
-    elif abs(value) >= 1_000:
-        return f"\u20ac{value/1_000:,.{decimals}f}K"
-    return f"\u20ac{value:,.{decimals}f}"
+    k = _magnitude(value)
+    return f"\u20ac{value / _MAGNITUDE_DIVISORS[k]:,.{decimals}f}{_MAGNITUDE_SUFFIXES[k]}"
+
+
+def fmt_eur_series(values, decimals=0):
+    """Vectorized fmt_eur: format a numeric Series as EUR labels (same index)."""
+    arr = values.to_numpy(dtype=float)
+    abs_arr = np.abs(arr)
+    k = (abs_arr >= 1_000).astype(np.intp) + (abs_arr >= 1_000_000)
+    scaled = arr / np.take(_MAGNITUDE_DIVISORS, k)
+    return pd.Series(
+        [f"\u20ac{v:,.{decimals}f}{_MAGNITUDE_SUFFIXES[i]}" for v, i in zip(scaled.tolist(), k.tolist())],
+        index=values.index, dtype=object,
+    )
 
 
 def fmt_pct(value, decimals=1):
@@ -321,8 +457,5 @@ def fmt_pct(value, decimals=1):
 
 def fmt_number(value, decimals=0):
     """Format a plain number with thousand separators."""
-    if abs(value) >= 1_000_000:
-        return f"{value/1_000_000:,.{decimals}f}M"
-    elif abs(value) >= 1_000:
-        return f"{value/1_000:,.{decimals}f}K"
-    return f"{value:,.{decimals}f}"
+    k = _magnitude(value)
+    return f"{value / _MAGNITUDE_DIVISORS[k]:,.{decimals}f}{_MAGNITUDE_SUFFIXES[k]}"
@@ -13,10 +13,28 @@ HOW TO CONFIGURE FOR YOUR ODOO INSTANCE
    Use exact codes like '800000' for precision, or prefixes like '8%' for ranges.
 """
 
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
+
+
+def _freeze(obj):
+    """Recursively wrap dicts in read-only MappingProxyType and lists in tuples.
+
+    The maps below are static configuration shared by every session and by
+    the st.cache_data/lru_cache layers; freezing them turns an accidental
+    in-place edit into a TypeError instead of silently stale caches.
+    """
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
 # ──────────────────────────────────────────────
 # WAKULI BRAND PALETTE
 # ──────────────────────────────────────────────
-COLORS = {
+COLORS = _freeze({
     "orange": "#FF6B35",
     "orange_light": "#FF8066",
     "teal": "#004E64",
@@ -31,7 +49,7 @@ COLORS = {
     "white": "#FFFFFF",
     "red": "#E63946",
     "red_light": "#FF6B6B",
-}
+})
 
 CHART_COLORS = [
     "#FF6B35", "#004E64", "#25A18E", "#F7B801",
@@ -47,10 +65,19 @@ COLOR_NEGATIVE = "#E63946"
 COLOR_NEUTRAL = "#B0B0B0"
 COLOR_WARNING = "#F7B801"
 
+
+def _hex_to_rgb(hex_color):
+    h = hex_color.lstrip('#')
+    return (int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16))
+
+
+# Palette pre-parsed to (r, g, b), for translucent rgba() fills and the like
+COLORS_RGB = MappingProxyType({k: _hex_to_rgb(v) for k, v in COLORS.items()})
+
 # ──────────────────────────────────────────────
 # STORE LOCATIONS
 # ──────────────────────────────────────────────
-STORE_LOCATIONS = {
+STORE_LOCATIONS = _freeze({
     "LIN": {"name": "Linnaeusstraat", "address": "Linnaeusstraat 237a", "city": "Amsterdam", "lat": 52.3579, "lon": 4.9274, "sqm": 65, "opened": "2021-03"},
     "JPH": {"name": "Jan Pieter Heijestraat", "address": "Jan Pieter Heijestraat 76", "city": "Amsterdam", "lat": 52.3627, "lon": 4.8583, "sqm": 55, "opened": "2021-06"},
     "HAP": {"name": "Haarlemmerplein", "address": "Haarlemmerplein 43", "city": "Amsterdam", "lat": 52.3847, "lon": 4.8819, "sqm": 70, "opened": "2021-09"},
@@ -72,18 +99,18 @@ STORE_LOCATIONS = {
     "HAS": {"name": "Haarlemmerstraat", "address": "Haarlemmerstraat 127", "city": "Leiden", "lat": 52.1601, "lon": 4.4894, "sqm": 55, "opened": "2025-01"},
     "STOEL": {"name": "Stoeldraaierstraat", "address": "Stoeldraaierstraat 70", "city": "Groningen", "lat": 53.2171, "lon": 6.5613, "sqm": 58, "opened": "2025-03"},
     "OOH": {"name": "Overhead (All Stores)", "address": "Central Office", "city": "Amsterdam", "lat": 52.3676, "lon": 4.9041, "sqm": 0, "opened": "2021-01"},
-}
+})
 
 # Odoo analytics IDs (analytic_distribution keys in account.move.line)
-STORE_ODOO_IDS = {
+STORE_ODOO_IDS = _freeze({
     "LIN": 17046, "JPH": 17047, "HAP": 17048, "WAG": 17049, "AMS": 17050,
     "VIJZ": 17051, "TWIJN": 17052, "ZIEK": 17053, "WOU": 17054, "NOB": 17055,
     "JAC": 22869, "BAJES": 28826, "FAH": 18393, "MEENT": 53942, "LUST": 51003,
     "VIS": 58577, "THER": 58498, "PIET": 58578, "HAS": 58596, "STOEL": 58603,
     "OOH": 19878,
-}
+})
 
-ODOO_ID_TO_STORE = {v: k for k, v in STORE_ODOO_IDS.items()}
+ODOO_ID_TO_STORE = MappingProxyType({v: k for k, v in STORE_ODOO_IDS.items()})
 
 # Wakuli Retail Holding company ID in Odoo
 RETAIL_HOLDING_ID = 2
@@ -106,11 +133,47 @@ RETAIL_HOLDING_ID = 2
 #       "group": Optional grouping for roll-ups (e.g. "cogs", "opex", "fixed")
 #   }
 #
+# At import each category dict is frozen into an AccountEntry (below), so
+# code reads entry.label / entry.sign_mult instead of dict lookups.
+#
 # To discover your actual account codes, use the Account Explorer in the
 # dashboard sidebar, or query Odoo:
 #   Accounting > Configuration > Chart of Accounts
 
-ACCOUNT_MAP = {
+# balance = debit - credit, so credit accounts negate it; "abs" (0) is
+# handled separately by the caller.
+_SIGN_TABLE = {"credit": -1, "debit": 1, "abs": 0}
+
+
+class AccountEntry(NamedTuple):
+    """One ACCOUNT_MAP category, frozen from its config dict."""
+    codes: tuple
+    label: str
+    sign: str = "abs"
+    group: str = ""
+    is_fixed: bool = False
+    sign_mult: int = 0
+
+
+def _freeze_account_map(account_map):
+    """Freeze ACCOUNT_MAP: sections become read-only maps of AccountEntry."""
+    return MappingProxyType({
+        sec: MappingProxyType({
+            cat_key: AccountEntry(
+                codes=tuple(entry["codes"]),
+                label=entry["label"],
+                sign=entry.get("sign", "abs"),
+                group=entry.get("group", sec),
+                is_fixed=entry.get("is_fixed", False),
+                sign_mult=_SIGN_TABLE.get(entry.get("sign", "abs"), 0),
+            )
+            for cat_key, entry in categories.items()
+        })
+        for sec, categories in account_map.items()
+    })
+
+
+ACCOUNT_MAP = _freeze_account_map({
     # ── REVENUE ──────────────────────────────────
     # All revenue accounts. The dashboard sums these for total revenue,
     # and breaks down by category for the Revenue Analytics tab.
@@ -293,47 +356,101 @@ ACCOUNT_MAP = {
             "group": "capex",
         },
     },
-}
-
-# Convenience: flat dict of CAPEX account code -> label (used by sidebar checkboxes)
-CAPEX_ACCOUNTS = {
-    code: entry["label"]
-    for entry in ACCOUNT_MAP["capex"].values()
-    for code in entry["codes"]
-}
+})
+
+# Flat views over ACCOUNT_MAP, built in a single pass at import:
+#   CAPEX_ACCOUNTS: CAPEX account code -> label (used by sidebar checkboxes)
+#   ACCOUNT_CODE_TO_ENTRY: code pattern -> (section, category_key, entry)
+#   ACCOUNT_CODES_BY_SECTION: section -> tuple of all its code patterns
+# A pattern listed twice keeps its first owner, matching lookup order below.
+CAPEX_ACCOUNTS = {}
+ACCOUNT_CODE_TO_ENTRY = {}
+ACCOUNT_CODES_BY_SECTION = {}
+for _sec, _categories in ACCOUNT_MAP.items():
+    _section_codes = []
+    for _cat_key, _entry in _categories.items():
+        _section_codes.extend(_entry.codes)
+        for _code in _entry.codes:
+            ACCOUNT_CODE_TO_ENTRY.setdefault(_code, (_sec, _cat_key, _entry))
+            if _sec == "capex":
+                CAPEX_ACCOUNTS[_code] = _entry.label
+    ACCOUNT_CODES_BY_SECTION[_sec] = tuple(_section_codes)
+# Read-only once built, like the config maps they are derived from
+CAPEX_ACCOUNTS = MappingProxyType(CAPEX_ACCOUNTS)
+ACCOUNT_CODE_TO_ENTRY = MappingProxyType(ACCOUNT_CODE_TO_ENTRY)
+ACCOUNT_CODES_BY_SECTION = MappingProxyType(ACCOUNT_CODES_BY_SECTION)
 
 
 def get_all_account_codes(section):
-    """Get all account code patterns for a given section of the ACCOUNT_MAP."""
-    codes = []
-    for entry in ACCOUNT_MAP.get(section, {}).values():
-        codes.extend(entry["codes"])
-    return codes
-
-
-def get_category_for_account_code(raw_code, section=None):
-    """Given an Odoo account code string, find the matching category key.
+    """Get all account code patterns for a given section of the ACCOUNT_MAP.
 
-    Tries exact match first, then prefix matching (longest prefix wins).
-    Returns (section, category_key, entry_dict) or (None, None, None).
+    Returns the precomputed tuple from ACCOUNT_CODES_BY_SECTION (empty for an
+    unknown section). It is shared and immutable, so callers that need to
+    add codes must build their own list from it.
     """
-    sections_to_search = [section] if section else list(ACCOUNT_MAP.keys())
-    best_match = (None, None, None)
-    best_match_len = 0
+    return ACCOUNT_CODES_BY_SECTION.get(section, ())
+
 
-    for sec in sections_to_search:
+# Lookup index over ACCOUNT_MAP, built on first lookup (demo mode never pulls
+# from Odoo, so it never pays for it). Each index is a pair of
+# (exact overrides, prefix buckets). Prefix buckets are (length,
+# {prefix: match}) pairs, longest first, so a lookup probes one dict per
+# distinct prefix length. Iteration order mirrors ACCOUNT_MAP so the first
+# pattern wins ties, exactly as the original linear scan did.
+#
+# An exact pattern match is almost always also the longest prefix match, so
+# the exact pass only keeps the patterns where the two disagree (e.g. "800000"
+# listed after an earlier "800000%"). For the shipped map it is empty.
+def _longest_prefix_match(raw_code, prefix_buckets):
+    # Buckets longer than the code itself can never match, so skip them.
+    code_len = len(raw_code)
+    for length, prefixes in prefix_buckets:
+        if length > code_len:
+            continue
+        match = prefixes.get(raw_code[:length])
+        if match is not None:
+            return match
+    return (None, None, None)
+
+
+@lru_cache(maxsize=None)
+def _account_index(section=None):
+    """Return (exact_overrides, prefix_buckets) for one section, or all when None."""
+    exact, by_len = {}, {}
+    for sec in ([section] if section else ACCOUNT_MAP):
         for cat_key, entry in ACCOUNT_MAP.get(sec, {}).items():
-            for pattern in entry["codes"]:
+            match = (sec, cat_key, entry)
+            for pattern in entry.codes:
+                exact.setdefault(pattern, match)
                 # Convert Odoo =like pattern to a prefix for matching
                 prefix = pattern.rstrip('%')
-                if raw_code.startswith(prefix) and len(prefix) > best_match_len:
-                    best_match = (sec, cat_key, entry)
-                    best_match_len = len(prefix)
-                # Exact match always wins
-                if raw_code == pattern:
-                    return (sec, cat_key, entry)
+                if prefix:
+                    by_len.setdefault(len(prefix), {}).setdefault(prefix, match)
+    prefix_buckets = tuple(sorted(by_len.items(), reverse=True))
+    exact_overrides = {
+        pattern: match for pattern, match in exact.items()
+        if _longest_prefix_match(pattern, prefix_buckets) != match
+    }
+    return exact_overrides, prefix_buckets
 
-    return best_match
+
+@lru_cache(maxsize=1024)
+def get_category_for_account_code(raw_code, section=None):
+    """Given an Odoo account code string, find the matching category key.
+
+    Exact match wins, otherwise the longest matching prefix.
+    Returns (section, category_key, entry_dict) or (None, None, None).
+
+    Memoized per (raw_code, section): a P&L pull repeats the same few dozen
+    account codes across thousands of move lines. ACCOUNT_MAP is frozen at
+    import, so the cached entries can never go stale.
+    """
+    if section and section not in ACCOUNT_MAP:
+        return (None, None, None)
+    exact_overrides, prefix_buckets = _account_index(section or None)
+    if exact_overrides and raw_code in exact_overrides:
+        return exact_overrides[raw_code]
+    return _longest_prefix_match(raw_code, prefix_buckets)
 
 
 def get_sign_multiplier(entry):
@@ -341,52 +458,47 @@ def get_sign_multiplier(entry):
 
     - "credit": use credit - debit (positive for revenue)
     - "debit":  use debit - credit (positive for expenses)
-    - "abs":    use absolute value of balance
+    - "abs":    use absolute value of balance (returns 0)
     """
-    sign = entry.get("sign", "abs")
-    if sign == "credit":
-        return -1  # balance = debit - credit, so negate for revenue
-    elif sign == "debit":
-        return 1
-    return 0  # "abs" handled separately
+    return entry.sign_mult
 
 
 # ──────────────────────────────────────────────
 # PRODUCT CATEGORIES (for revenue breakdown)
 # ──────────────────────────────────────────────
 # Maps revenue account category keys to product labels
-PRODUCT_CATEGORIES = {
+PRODUCT_CATEGORIES = _freeze({
     "coffee": {"label": "Coffee & Espresso", "icon": "coffee", "target_cogs_pct": 0.28},
     "food": {"label": "Food & Pastries", "icon": "cake", "target_cogs_pct": 0.32},
     "merchandise": {"label": "Merchandise", "icon": "shopping_bag", "target_cogs_pct": 0.45},
     "subscription": {"label": "Subscriptions", "icon": "autorenew", "target_cogs_pct": 0.25},
-}
+})
 
 # Maps revenue ACCOUNT_MAP keys to product category keys (for category breakdown charts)
-REVENUE_TO_PRODUCT_CATEGORY = {
+REVENUE_TO_PRODUCT_CATEGORY = _freeze({
     "coffee_sales": "coffee",
     "food_sales": "food",
     "merchandise_sales": "merchandise",
     "subscription_revenue": "subscription",
     "delivery_revenue": "coffee",  # delivery is mostly coffee
-}
+})
 
 
 # ──────────────────────────────────────────────
 # DAYPART DEFINITIONS
 # ──────────────────────────────────────────────
-DAYPARTS = {
+DAYPARTS = _freeze({
     "early_morning": {"label": "Early Morning", "hours": (6, 9), "color": "#F7B801"},
     "morning": {"label": "Morning Rush", "hours": (9, 12), "color": "#FF6B35"},
     "afternoon": {"label": "Afternoon", "hours": (12, 15), "color": "#004E64"},
     "late_afternoon": {"label": "Late Afternoon", "hours": (15, 18), "color": "#25A18E"},
     "evening": {"label": "Evening", "hours": (18, 21), "color": "#2D3142"},
-}
+})
 
 # ──────────────────────────────────────────────
 # KPI TARGETS & BENCHMARKS
 # ──────────────────────────────────────────────
-TARGETS = {
+TARGETS = _freeze({
     "gross_margin_pct": 0.68,
     "net_margin_pct": 0.12,
     "labor_cost_pct": 0.30,
@@ -399,12 +511,12 @@ TARGETS = {
     "customer_retention_pct": 0.45,
     "inventory_turnover": 24,
     "break_even_months": 18,
-}
+})
 
 # ──────────────────────────────────────────────
 # IMPACT METRICS (Wakuli mission)
 # ──────────────────────────────────────────────
-IMPACT_DEFAULTS = {
+IMPACT_DEFAULTS = _freeze({
     "farmer_premium_pct": 0.35,
     "direct_trade_pct": 0.92,
     "farmers_supported": 847,
@@ -412,9 +524,9 @@ IMPACT_DEFAULTS = {
     "compostable_packaging_pct": 0.88,
     "co2_per_cup_grams": 68,
     "kg_coffee_per_month": 2800,
-}
+})
 
-SOURCING_ORIGINS = [
+SOURCING_ORIGINS = _freeze([
     {"country": "Ethiopia", "region": "Yirgacheffe", "lat": 6.16, "lon": 38.20, "farmers": 234, "pct": 0.28},
     {"country": "Colombia", "region": "Huila", "lat": 2.53, "lon": -75.53, "farmers": 156, "pct": 0.18},
     {"country": "Kenya", "region": "Nyeri", "lat": -0.42, "lon": 36.95, "farmers": 98, "pct": 0.12},
@@ -423,7 +535,7 @@ SOURCING_ORIGINS = [
     {"country": "Guatemala", "region": "Antigua", "lat": 14.56, "lon": -90.73, "farmers": 72, "pct": 0.09},
     {"country": "Brazil", "region": "Minas Gerais", "lat": -18.51, "lon": -44.55, "farmers": 56, "pct": 0.07},
     {"country": "Uganda", "region": "Mt. Elgon", "lat": 1.13, "lon": 34.53, "farmers": 32, "pct": 0.03},
-]
+])
 
 
 # ──────────────────────────────────────────────
@@ -431,11 +543,11 @@ SOURCING_ORIGINS = [
 # ──────────────────────────────────────────────
 # Fill these in with actual buildout costs. Used for ROI and break-even.
 # Set to 0 or omit stores where data is unknown.
-STORE_INVESTMENTS = {
+STORE_INVESTMENTS = _freeze({
     # "LIN": {"buildout": 75000, "equipment": 35000, "furniture": 12000, "working_capital": 20000},
     # "JPH": {"buildout": 65000, "equipment": 32000, "furniture": 10000, "working_capital": 18000},
     # ... fill in per store
-}
+})
 
 
 # ──────────────────────────────────────────────
@@ -443,12 +555,12 @@ STORE_INVESTMENTS = {
 # ──────────────────────────────────────────────
 # Set these to True if the corresponding Odoo modules are installed.
 # The dashboard will attempt to query these models for richer data.
-ODOO_MODULES = {
+ODOO_MODULES = _freeze({
     "pos": False,        # Odoo Point of Sale (pos.order, pos.order.line)
     "hr": False,         # Odoo HR / Payroll (hr.employee)
     "stock": False,      # Odoo Inventory (stock.move, stock.valuation.layer)
     "asset": False,      # Odoo Assets (account.asset)
-}
+})
 
 
 # ──────────────────────────────────────────────
@@ -470,7 +582,7 @@ ODOO_MODULES = {
 # "companies" below. Each entry maps a Nmbrs company ID to a human-
 # readable label shown in the dashboard. Employee data from all listed
 # companies is merged into one unified labor dataset.
-NMBRS_CONFIG = {
+NMBRS_CONFIG = _freeze({
     "enabled": True,         # Set to False to disable Nmbrs integration
     "companies": {
         # Nmbrs company ID → display label
@@ -481,7 +593,7 @@ NMBRS_CONFIG = {
     },
     "full_time_hours": 40,   # Weekly hours for FTE=1.0 (NL standard: 40)
     "employer_burden_pct": 0.30,  # Social charges, pension, insurance on top of gross
-}
+})
 
 # Map Nmbrs department names or cost center codes to Wakuli store codes.
 # The connector uses this to assign employees to the correct store.
@@ -494,7 +606,7 @@ NMBRS_CONFIG = {
 #   "Linnaeusstraat": "LIN",
 #   "Jan Pieter Heijestraat": "JPH",
 #   "CC001": "LIN",   # cost center code
-NMBRS_DEPARTMENT_TO_STORE = {
+NMBRS_DEPARTMENT_TO_STORE = _freeze({
     # ── Fill in your Nmbrs department → store mapping ──
     # "Department Name in Nmbrs": "STORE_CODE",
     "Linnaeusstraat": "LIN",
@@ -520,13 +632,13 @@ NMBRS_DEPARTMENT_TO_STORE = {
     "Overhead": "OOH",
     "Head Office": "OOH",
     "Hoofdkantoor": "OOH",
-}
+})
 
 
 # ──────────────────────────────────────────────
 # APP CONFIGURATION
 # ──────────────────────────────────────────────
-APP_CONFIG = {
+APP_CONFIG = _freeze({
     "page_title": "Wakuli Retail Analytics",
     "page_icon": "☕",
     "layout": "wide",
@@ -534,4 +646,4 @@ APP_CONFIG = {
     "cache_ttl_auth": 600,
     "cache_ttl_data": 300,
     "max_odoo_records": 10000,
-}
+})
@@ -9,130 +9,171 @@ inventory, and impact metrics across all 20 Wakuli stores.
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from functools import lru_cache
 from config import STORE_LOCATIONS, CAPEX_ACCOUNTS, PRODUCT_CATEGORIES, DAYPARTS
 
+# Per-store constants for the generators, in STORE_LOCATIONS order without
+# OOH. STORE_LOCATIONS is static config, so `opened` is parsed once here.
+_STORE_CODES = np.array([c for c in STORE_LOCATIONS if c != "OOH"], dtype=object)
+_STORE_NAMES = np.array([STORE_LOCATIONS[c]['name'] for c in _STORE_CODES], dtype=object)
+_STORE_SQM = np.array([STORE_LOCATIONS[c].get('sqm', 55) for c in _STORE_CODES])
+_STORE_OPENED_YEAR = np.array([int(STORE_LOCATIONS[c].get('opened', '2022-01')[:4]) for c in _STORE_CODES])
+_STORE_OPENED_MONTH = np.array([int(STORE_LOCATIONS[c].get('opened', '2022-01')[5:7]) for c in _STORE_CODES])
+_SQM_BY_STORE = {code: info.get('sqm', 55) for code, info in STORE_LOCATIONS.items()}
+
+# Revenue seasonality by month number: higher in winter months (coffee!).
+# Index 0 is unused so the array can be indexed with month numbers directly.
+_SEASONALITY = np.array([1.0, 1.05, 1.02, 0.98, 0.95, 0.93, 0.88,
+                         0.85, 0.87, 0.95, 1.02, 1.08, 1.15])
+
 
 def _seed():
-    return np.random.RandomState(42)
+    return np.random.default_rng(42)
+
+
+# Ratio and count columns averaged/summed in the tabs; their magnitudes
+# (ratios, counts in the thousands) don't need 64-bit storage, and narrower
+# columns halve the bytes scanned by every groupby. Only the demo customer
+# and inventory frames carry them. Money columns (amount, revenue,
+# stock_value) stay float64: float32's ~7 significant digits would drift
+# multi-million totals by whole euros in the KPI cards and exports.
+_FLOAT_DOWNCAST_COLS = ('avg_transaction_value', 'retention_rate')
+_INT_DOWNCAST_COLS = ('unique_customers', 'total_transactions', 'new_customers', 'returning_customers',
+                      'opening_stock', 'purchased', 'sold', 'waste', 'closing_stock')
+
+
+def _downcast_numeric(df):
+    """Return df with its aggregation columns narrowed to float32 / smallest int."""
+    narrowed = {}
+    for col in _FLOAT_DOWNCAST_COLS:
+        if col in df.columns:
+            narrowed[col] = pd.to_numeric(df[col], downcast='float')
+    for col in _INT_DOWNCAST_COLS:
+        if col in df.columns:
+            narrowed[col] = pd.to_numeric(df[col], downcast='integer')
+    return df.assign(**narrowed) if narrowed else df
+
+
+def _elapsed_periods(selected_years):
+    """(year, month) pairs of selected_years up to the current month; demo
+    data is never generated for future months."""
+    now = datetime.now()
+    return [(year, month) for year in selected_years for month in range(1, 13)
+            if year < now.year or (year == now.year and month <= now.month)]
 
 
 def generate_capex_data(selected_years):
     """Generate demo CAPEX transactions."""
     rng = _seed()
-    stores = [c for c in STORE_LOCATIONS if c != "OOH"]
-    accounts = list(CAPEX_ACCOUNTS.keys())
-    account_labels = list(CAPEX_ACCOUNTS.values())
-
-    rows = []
-    for year in selected_years:
-        n_transactions = rng.randint(40, 70)
-        for _ in range(n_transactions):
-            month = rng.randint(1, 13)
-            if month > 12:
-                month = 12
-            day = rng.randint(1, 29)
-            store = rng.choice(stores)
-            acc_idx = rng.randint(0, len(accounts))
-            amount = float(rng.choice([5000, 8000, 10000, 12000, 15000, 18000, 22000, 25000, 30000, 35000, 45000]))
-            amount *= rng.uniform(0.7, 1.4)
-
-            rows.append({
-                'date': f'{year}-{month:02d}-{day:02d}',
-                'year': year,
-                'month': f'{year}-{month:02d}',
-                'amount': round(amount, 2),
-                'description': f'{account_labels[acc_idx].split("(")[0].strip()} - {STORE_LOCATIONS[store]["name"]}',
-                'account_code': accounts[acc_idx],
-                'account_label': account_labels[acc_idx],
-                'cost_category': accounts[acc_idx],
-                'cost_label': account_labels[acc_idx],
-                'store_code': store,
-                'store_name': STORE_LOCATIONS[store]['name'],
-                'move_id': None,
-                'move_name': '',
-                'section': 'capex',
-                'group': 'capex',
-            })
-
-    return pd.DataFrame(rows)
+    accounts = np.array(list(CAPEX_ACCOUNTS.keys()), dtype=object)
+    account_labels = np.array(list(CAPEX_ACCOUNTS.values()), dtype=object)
+    amounts = [5000, 8000, 10000, 12000, 15000, 18000, 22000, 25000, 30000, 35000, 45000]
+
+    # All transactions for all years drawn in one go, year by year in order
+    n_transactions = rng.integers(40, 70, size=len(selected_years))
+    n_total = int(n_transactions.sum())
+    years = np.repeat(np.array(selected_years, dtype=np.int64), n_transactions)
+    months = rng.integers(1, 13, size=n_total)
+    days = rng.integers(1, 29, size=n_total)
+    store_idx = rng.integers(0, len(_STORE_CODES), size=n_total)
+    acc_idx = rng.integers(0, len(accounts), size=n_total)
+    amount = rng.choice(amounts, size=n_total) * rng.uniform(0.7, 1.4, size=n_total)
+
+    month_labels = [f'{year}-{month:02d}' for year, month in zip(years.tolist(), months.tolist())]
+    store_names = _STORE_NAMES[store_idx]
+    short_labels = np.array([label.split("(")[0].strip() for label in account_labels], dtype=object)
+
+    return pd.DataFrame({
+        'date': [f'{month}-{day:02d}' for month, day in zip(month_labels, days.tolist())],
+        'year': years,
+        'month': month_labels,
+        'amount': amount.round(2),
+        'description': short_labels[acc_idx] + ' - ' + store_names,
+        'account_code': accounts[acc_idx],
+        'account_label': account_labels[acc_idx],
+        'cost_category': accounts[acc_idx],
+        'cost_label': account_labels[acc_idx],
+        'store_code': _STORE_CODES[store_idx],
+        'store_name': store_names,
+        'move_id': None,
+        'move_name': '',
+        'section': 'capex',
+        'group': 'capex',
+    })
 
 
 def generate_revenue_data(selected_years):
     """Generate monthly revenue data by store, category, and channel."""
     rng = _seed()
-    stores = [c for c in STORE_LOCATIONS if c != "OOH"]
-    categories = list(PRODUCT_CATEGORIES.keys())
-    channels = ['dine_in', 'takeaway', 'delivery', 'subscription']
-
     # Base monthly revenue per store (varies by store size/location)
-    store_base_revenue = {}
-    for code in stores:
-        sqm = STORE_LOCATIONS[code].get('sqm', 55)
-        store_base_revenue[code] = sqm * rng.uniform(550, 750)
-
-    rows = []
-    for year in selected_years:
-        for month in range(1, 13):
-            # Skip future months
-            now = datetime.now()
-            if year > now.year or (year == now.year and month > now.month):
-                continue
-
-            # Seasonality: higher in winter months (coffee!)
-            seasonality = {1: 1.05, 2: 1.02, 3: 0.98, 4: 0.95, 5: 0.93,
-                          6: 0.88, 7: 0.85, 8: 0.87, 9: 0.95, 10: 1.02,
-                          11: 1.08, 12: 1.15}
-            season_mult = seasonality.get(month, 1.0)
-
-            for store in stores:
-                # Growth factor: stores get more revenue over time
-                opened = STORE_LOCATIONS[store].get('opened', '2022-01')
-                opened_year, opened_month = int(opened[:4]), int(opened[5:7])
-                months_open = (year - opened_year) * 12 + (month - opened_month)
-                if months_open < 0:
-                    continue
-                # Ramp-up in first 6 months
-                ramp = min(1.0, 0.4 + 0.1 * months_open) if months_open < 6 else 1.0
-                # Organic growth ~0.5% per month
-                growth = 1.0 + 0.005 * max(0, months_open - 6)
-
-                base = store_base_revenue[store] * season_mult * ramp * growth
-                noise = rng.uniform(0.88, 1.12)
-                total_revenue = base * noise
-
-                # Split by category
-                cat_splits = {'coffee': 0.58, 'food': 0.25, 'merchandise': 0.07, 'subscription': 0.10}
-                # Split by channel
-                ch_splits = {'dine_in': 0.52, 'takeaway': 0.33, 'delivery': 0.08, 'subscription': 0.07}
-
-                for cat, cat_pct in cat_splits.items():
-                    for ch, ch_pct in ch_splits.items():
-                        rev = total_revenue * cat_pct * ch_pct * rng.uniform(0.9, 1.1)
-                        if rev > 0:
-                            rows.append({
-                                'year': year,
-                                'month': f'{year}-{month:02d}',
-                                'store_code': store,
-                                'store_name': STORE_LOCATIONS[store]['name'],
-                                'category': cat,
-                                'category_label': PRODUCT_CATEGORIES[cat]['label'],
-                                'channel': ch,
-                                'revenue': round(rev, 2),
-                            })
-
-    return pd.DataFrame(rows)
-
-
-def generate_cost_data(revenue_df):
+    store_base_revenue = _STORE_SQM * rng.uniform(550, 750, size=len(_STORE_CODES))
+
+    periods = _elapsed_periods(selected_years)
+    period_years = np.array([y for y, _ in periods], dtype=np.int64)
+    period_months = np.array([m for _, m in periods], dtype=np.int64)
+
+    season_mult = _SEASONALITY[period_months]
+
+    # Growth factor: stores get more revenue over time. Everything below is
+    # a (period, store) grid; stores not yet open are masked out at the end.
+    months_open = ((period_years[:, None] - _STORE_OPENED_YEAR) * 12
+                   + (period_months[:, None] - _STORE_OPENED_MONTH))
+    # Ramp-up in first 6 months
+    ramp = np.where(months_open < 6, np.minimum(1.0, 0.4 + 0.1 * months_open), 1.0)
+    # Organic growth ~0.5% per month
+    growth = 1.0 + 0.005 * np.maximum(0, months_open - 6)
+
+    base = store_base_revenue * season_mult[:, None] * ramp * growth
+    noise = rng.uniform(0.88, 1.12, size=base.shape)
+    total_revenue = base * noise
+
+    # Split by category
+    cat_splits = {'coffee': 0.58, 'food': 0.25, 'merchandise': 0.07, 'subscription': 0.10}
+    # Split by channel
+    ch_splits = {'dine_in': 0.52, 'takeaway': 0.33, 'delivery': 0.08, 'subscription': 0.07}
+    split = np.outer(list(cat_splits.values()), list(ch_splits.values()))
+    n_splits = split.size
+
+    # One row per (period, store) that is open, times category x channel
+    period_idx, store_idx = np.nonzero(months_open >= 0)
+    rev = (total_revenue[period_idx, store_idx, None, None] * split
+           * rng.uniform(0.9, 1.1, size=(len(period_idx),) + split.shape)).ravel()
+
+    month_labels = np.array([f'{y}-{m:02d}' for y, m in periods], dtype=object)
+    categories = np.repeat(np.array(list(cat_splits), dtype=object), len(ch_splits))
+    category_labels = np.array([PRODUCT_CATEGORIES[cat]['label'] for cat in categories], dtype=object)
+    channels = np.tile(np.array(list(ch_splits), dtype=object), len(cat_splits))
+
+    df = pd.DataFrame({
+        'year': np.repeat(period_years[period_idx], n_splits),
+        'month': np.repeat(month_labels[period_idx], n_splits),
+        'store_code': np.repeat(_STORE_CODES[store_idx], n_splits),
+        'store_name': np.repeat(_STORE_NAMES[store_idx], n_splits),
+        'category': np.tile(categories, len(period_idx)),
+        'category_label': np.tile(category_labels, len(period_idx)),
+        'channel': np.tile(channels, len(period_idx)),
+        'revenue': rev.round(2),
+    })
+    return df[rev > 0].reset_index(drop=True)
+
+
+def _monthly_revenue(revenue_df):
+    """Revenue summed per store-month: the base for the cost, customer and
+    labor generators. generate_all_demo_data computes it once and passes it
+    to all three."""
+    return revenue_df.groupby(['year', 'month', 'store_code', 'store_name'])['revenue'].sum().reset_index()
+
+
+def generate_cost_data(revenue_df, monthly_rev=None):
     """Generate cost data based on revenue (realistic cost ratios)."""
     rng = _seed()
     if revenue_df.empty:
         return pd.DataFrame()
 
     # Aggregate revenue by store/month
-    monthly_rev = revenue_df.groupby(['year', 'month', 'store_code', 'store_name'])['revenue'].sum().reset_index()
+    if monthly_rev is None:
+        monthly_rev = _monthly_revenue(revenue_df)
 
-    rows = []
     cost_categories = {
         'cogs_coffee': {'label': 'COGS - Coffee', 'pct_of_revenue': 0.18, 'variance': 0.03},
         'cogs_food': {'label': 'COGS - Food', 'pct_of_revenue': 0.09, 'variance': 0.02},
@@ -147,113 +188,99 @@ def generate_cost_data(revenue_df):
         'depreciation': {'label': 'Depreciation', 'pct_of_revenue': 0.04, 'variance': 0.005},
     }
 
-    for _, row in monthly_rev.iterrows():
-        rev = row['revenue']
-        for cost_key, cost_info in cost_categories.items():
-            pct = cost_info['pct_of_revenue'] + rng.uniform(-cost_info['variance'], cost_info['variance'])
-            cost = rev * max(0, pct)
-            rows.append({
-                'year': row['year'],
-                'month': row['month'],
-                'store_code': row['store_code'],
-                'store_name': row['store_name'],
-                'cost_category': cost_key,
-                'cost_label': cost_info['label'],
-                'amount': round(cost, 2),
-            })
+    # One draw per (store-month, cost category), scaled by that category's variance
+    pct_of_revenue = np.array([c['pct_of_revenue'] for c in cost_categories.values()])
+    variance = np.array([c['variance'] for c in cost_categories.values()])
+    n_rows, n_costs = len(monthly_rev), len(cost_categories)
+    pct = pct_of_revenue + rng.uniform(-1, 1, size=(n_rows, n_costs)) * variance
+    cost = monthly_rev['revenue'].to_numpy()[:, None] * np.maximum(0, pct)
 
-    return pd.DataFrame(rows)
+    rows = monthly_rev.drop(columns='revenue').loc[monthly_rev.index.repeat(n_costs)]
+    return rows.assign(
+        cost_category=np.tile(list(cost_categories), n_rows),
+        cost_label=np.tile([c['label'] for c in cost_categories.values()], n_rows),
+        amount=cost.ravel().round(2),
+    ).reset_index(drop=True)
 
 
-def generate_customer_data(revenue_df):
+def generate_customer_data(revenue_df, monthly_rev=None):
     """Generate customer traffic and behavior data."""
     rng = _seed()
     if revenue_df.empty:
         return pd.DataFrame()
 
-    monthly_rev = revenue_df.groupby(['year', 'month', 'store_code', 'store_name'])['revenue'].sum().reset_index()
-
-    rows = []
-    for _, row in monthly_rev.iterrows():
-        avg_ticket = rng.uniform(5.20, 7.80)
-        total_transactions = int(row['revenue'] / avg_ticket)
-        # Unique customers is ~60-70% of transactions (repeat visits)
-        unique_customers = int(total_transactions * rng.uniform(0.55, 0.72))
-        new_customer_pct = rng.uniform(0.25, 0.45)
-        new_customers = int(unique_customers * new_customer_pct)
-        returning_customers = unique_customers - new_customers
-
-        # Daypart split
-        daypart_splits = {
-            'early_morning': rng.uniform(0.12, 0.18),
-            'morning': rng.uniform(0.30, 0.38),
-            'afternoon': rng.uniform(0.22, 0.28),
-            'late_afternoon': rng.uniform(0.12, 0.18),
-        }
-        daypart_splits['evening'] = 1.0 - sum(daypart_splits.values())
-
-        rows.append({
-            'year': row['year'],
-            'month': row['month'],
-            'store_code': row['store_code'],
-            'store_name': row['store_name'],
-            'revenue': row['revenue'],
-            'total_transactions': total_transactions,
-            'unique_customers': unique_customers,
-            'new_customers': new_customers,
-            'returning_customers': returning_customers,
-            'avg_transaction_value': round(avg_ticket, 2),
-            'retention_rate': round(1 - new_customer_pct, 3),
-            **{f'daypart_{k}_pct': round(v, 3) for k, v in daypart_splits.items()},
-        })
-
-    return pd.DataFrame(rows)
-
-
-def generate_labor_data(revenue_df):
+    if monthly_rev is None:
+        monthly_rev = _monthly_revenue(revenue_df)
+    revenue = monthly_rev['revenue'].to_numpy()
+    n_rows = len(monthly_rev)
+
+    avg_ticket = rng.uniform(5.20, 7.80, size=n_rows)
+    total_transactions = (revenue / avg_ticket).astype(int)
+    # Unique customers is ~60-70% of transactions (repeat visits)
+    unique_customers = (total_transactions * rng.uniform(0.55, 0.72, size=n_rows)).astype(int)
+    new_customer_pct = rng.uniform(0.25, 0.45, size=n_rows)
+    new_customers = (unique_customers * new_customer_pct).astype(int)
+
+    # Daypart split: one column per daypart, evening takes the remainder
+    daypart_ranges = {
+        'early_morning': (0.12, 0.18),
+        'morning': (0.30, 0.38),
+        'afternoon': (0.22, 0.28),
+        'late_afternoon': (0.12, 0.18),
+    }
+    low, high = np.array(list(daypart_ranges.values())).T
+    daypart_splits = rng.uniform(low, high, size=(n_rows, len(daypart_ranges)))
+    evening = 1.0 - daypart_splits.sum(axis=1)
+
+    return monthly_rev.assign(
+        total_transactions=total_transactions,
+        unique_customers=unique_customers,
+        new_customers=new_customers,
+        returning_customers=unique_customers - new_customers,
+        avg_transaction_value=avg_ticket.round(2),
+        retention_rate=(1 - new_customer_pct).round(3),
+        **{f'daypart_{k}_pct': daypart_splits[:, i].round(3) for i, k in enumerate(daypart_ranges)},
+        daypart_evening_pct=evening.round(3),
+    )
+
+
+def generate_labor_data(revenue_df, monthly_rev=None):
     """Generate labor productivity data."""
     rng = _seed()
     if revenue_df.empty:
         return pd.DataFrame()
 
-    monthly_rev = revenue_df.groupby(['year', 'month', 'store_code', 'store_name'])['revenue'].sum().reset_index()
-
-    rows = []
-    for _, row in monthly_rev.iterrows():
-        sqm = STORE_LOCATIONS.get(row['store_code'], {}).get('sqm', 55)
-        # Staff count scales with store size
-        fte_count = max(2, sqm / 18 + rng.uniform(-0.5, 0.5))
-        hours_per_fte = rng.uniform(140, 168)
-        total_labor_hours = fte_count * hours_per_fte
-        labor_cost = total_labor_hours * rng.uniform(14.5, 18.5)  # hourly rate EUR
-        revenue_per_labor_hour = row['revenue'] / total_labor_hours if total_labor_hours > 0 else 0
-
-        avg_ticket = rng.uniform(5.5, 7.5)
-        transactions = int(row['revenue'] / avg_ticket)
-        transactions_per_labor_hour = transactions / total_labor_hours if total_labor_hours > 0 else 0
-
-        rows.append({
-            'year': row['year'],
-            'month': row['month'],
-            'store_code': row['store_code'],
-            'store_name': row['store_name'],
-            'revenue': row['revenue'],
-            'fte_count': round(fte_count, 1),
-            'total_labor_hours': round(total_labor_hours, 0),
-            'labor_cost': round(labor_cost, 2),
-            'labor_cost_pct': round(labor_cost / row['revenue'], 3) if row['revenue'] > 0 else 0,
-            'revenue_per_labor_hour': round(revenue_per_labor_hour, 2),
-            'transactions_per_labor_hour': round(transactions_per_labor_hour, 1),
-            'revenue_per_employee': round(row['revenue'] / fte_count, 2) if fte_count > 0 else 0,
-        })
-
-    return pd.DataFrame(rows)
+    if monthly_rev is None:
+        monthly_rev = _monthly_revenue(revenue_df)
+    revenue = monthly_rev['revenue'].to_numpy()
+    n_rows = len(monthly_rev)
+
+    sqm = monthly_rev['store_code'].map(_SQM_BY_STORE).fillna(55).to_numpy()
+    # Staff count scales with store size
+    fte_count = np.maximum(2, sqm / 18 + rng.uniform(-0.5, 0.5, size=n_rows))
+    hours_per_fte = rng.uniform(140, 168, size=n_rows)
+    total_labor_hours = fte_count * hours_per_fte
+    labor_cost = total_labor_hours * rng.uniform(14.5, 18.5, size=n_rows)  # hourly rate EUR
+
+    avg_ticket = rng.uniform(5.5, 7.5, size=n_rows)
+    transactions = (revenue / avg_ticket).astype(int)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        has_hours = total_labor_hours > 0
+        return monthly_rev.assign(
+            fte_count=fte_count.round(1),
+            total_labor_hours=total_labor_hours.round(0),
+            labor_cost=labor_cost.round(2),
+            labor_cost_pct=np.where(revenue > 0, (labor_cost / revenue).round(3), 0),
+            revenue_per_labor_hour=np.where(has_hours, revenue / total_labor_hours, 0).round(2),
+            transactions_per_labor_hour=np.where(has_hours, transactions / total_labor_hours, 0).round(1),
+            revenue_per_employee=np.where(fte_count > 0, (revenue / fte_count).round(2), 0),
+        )
 
 
 def generate_inventory_data(selected_years):
     """Generate inventory management metrics."""
     rng = _seed()
-    stores = [c for c in STORE_LOCATIONS if c != "OOH"]
     inventory_items = [
         {'name': 'Single Origin Beans', 'category': 'coffee', 'unit_cost': 18.50},
         {'name': 'Blend Beans', 'category': 'coffee', 'unit_cost': 14.00},
@@ -265,47 +292,40 @@ def generate_inventory_data(selected_years):
         {'name': 'Syrups & Toppings', 'category': 'supplies', 'unit_cost': 8.50},
     ]
 
-    rows = []
-    for year in selected_years:
-        for month in range(1, 13):
-            now = datetime.now()
-            if year > now.year or (year == now.year and month > now.month):
-                continue
-            for store in stores:
-                for item in inventory_items:
-                    opening_stock = rng.randint(20, 150)
-                    purchased = rng.randint(30, 200)
-                    sold = rng.randint(25, int((opening_stock + purchased) * 0.85))
-                    waste = max(0, int(rng.uniform(0.02, 0.08) * sold))
-                    closing_stock = opening_stock + purchased - sold - waste
-
-                    rows.append({
-                        'year': year,
-                        'month': f'{year}-{month:02d}',
-                        'store_code': store,
-                        'store_name': STORE_LOCATIONS[store]['name'],
-                        'item_name': item['name'],
-                        'item_category': item['category'],
-                        'unit_cost': item['unit_cost'],
-                        'opening_stock': opening_stock,
-                        'purchased': purchased,
-                        'sold': sold,
-                        'waste': waste,
-                        'closing_stock': max(0, closing_stock),
-                        'stock_value': round(max(0, closing_stock) * item['unit_cost'], 2),
-                    })
-
-    return pd.DataFrame(rows)
+    periods = _elapsed_periods(selected_years)
+
+    # Every draw is a (period, store, item) block, flattened in that order
+    shape = (len(periods), len(_STORE_CODES), len(inventory_items))
+    opening_stock = rng.integers(20, 150, size=shape)
+    purchased = rng.integers(30, 200, size=shape)
+    sold = rng.integers(25, ((opening_stock + purchased) * 0.85).astype(int))
+    waste = np.maximum(0, (rng.uniform(0.02, 0.08, size=shape) * sold).astype(int))
+    closing_stock = np.maximum(0, opening_stock + purchased - sold - waste)
+    unit_cost = np.array([item['unit_cost'] for item in inventory_items])
+
+    n_periods, n_stores, n_items = shape
+    return pd.DataFrame({
+        'year': np.repeat(np.array([year for year, _ in periods], dtype=np.int64), n_stores * n_items),
+        'month': np.repeat([f'{year}-{month:02d}' for year, month in periods], n_stores * n_items),
+        'store_code': np.tile(np.repeat(_STORE_CODES, n_items), n_periods),
+        'store_name': np.tile(np.repeat(_STORE_NAMES, n_items), n_periods),
+        'item_name': np.tile([item['name'] for item in inventory_items], n_periods * n_stores),
+        'item_category': np.tile([item['category'] for item in inventory_items], n_periods * n_stores),
+        'unit_cost': np.tile(unit_cost, n_periods * n_stores),
+        'opening_stock': opening_stock.ravel(),
+        'purchased': purchased.ravel(),
+        'sold': sold.ravel(),
+        'waste': waste.ravel(),
+        'closing_stock': closing_stock.ravel(),
+        'stock_value': (closing_stock * unit_cost).ravel().round(2),
+    })
 
 
 def generate_investment_data():
     """Generate initial investment data per store for ROI calculations."""
     rng = _seed()
-    stores = [c for c in STORE_LOCATIONS if c != "OOH"]
-
     rows = []
-    for store in stores:
-        sqm = STORE_LOCATIONS[store].get('sqm', 55)
+    for store, sqm in zip(_STORE_CODES, _STORE_SQM.tolist()):
         base_buildout = sqm * rng.uniform(1200, 1800)
         equipment = rng.uniform(25000, 45000)
         furniture = sqm * rng.uniform(150, 300)
@@ -333,43 +353,38 @@ def generate_impact_data(selected_years):
     rng = _seed()
 
     rows = []
-    for year in selected_years:
-        for month in range(1, 13):
-            now = datetime.now()
-            if year > now.year or (year == now.year and month > now.month):
-                continue
-
-            # Growth in impact over time
-            months_since_start = (year - 2021) * 12 + month
-            growth_factor = 1.0 + 0.02 * months_since_start
-
-            kg_coffee = 2200 * growth_factor * rng.uniform(0.9, 1.1)
-            direct_trade_pct = min(0.98, 0.80 + 0.001 * months_since_start + rng.uniform(-0.02, 0.02))
-            farmers_supported = int(500 + 3 * months_since_start + rng.randint(-10, 10))
-            farmer_premium = 0.30 + 0.001 * months_since_start + rng.uniform(-0.02, 0.02)
-            market_price_per_kg = rng.uniform(4.50, 6.50)
-            wakuli_price_per_kg = market_price_per_kg * (1 + farmer_premium)
-            premium_paid = (wakuli_price_per_kg - market_price_per_kg) * kg_coffee * direct_trade_pct
-            compostable_pct = min(0.98, 0.75 + 0.002 * months_since_start)
-            co2_per_cup = max(55, 85 - 0.15 * months_since_start + rng.uniform(-3, 3))
-
-            # Cups served (avg ~200g per kg for espresso drinks)
-            cups_served = int(kg_coffee * 1000 / 18)  # ~18g per double shot
-
-            rows.append({
-                'year': year,
-                'month': f'{year}-{month:02d}',
-                'kg_coffee_sourced': round(kg_coffee, 1),
-                'direct_trade_pct': round(direct_trade_pct, 3),
-                'farmers_supported': farmers_supported,
-                'farmer_premium_pct': round(farmer_premium, 3),
-                'market_price_per_kg': round(market_price_per_kg, 2),
-                'wakuli_price_per_kg': round(wakuli_price_per_kg, 2),
-                'premium_paid_eur': round(premium_paid, 2),
-                'compostable_packaging_pct': round(compostable_pct, 3),
-                'co2_per_cup_grams': round(co2_per_cup, 1),
-                'cups_served': cups_served,
-            })
+    for year, month in _elapsed_periods(selected_years):
+        # Growth in impact over time
+        months_since_start = (year - 2021) * 12 + month
+        growth_factor = 1.0 + 0.02 * months_since_start
+
+        kg_coffee = 2200 * growth_factor * rng.uniform(0.9, 1.1)
+        direct_trade_pct = min(0.98, 0.80 + 0.001 * months_since_start + rng.uniform(-0.02, 0.02))
+        farmers_supported = int(500 + 3 * months_since_start + rng.integers(-10, 10))
+        farmer_premium = 0.30 + 0.001 * months_since_start + rng.uniform(-0.02, 0.02)
+        market_price_per_kg = rng.uniform(4.50, 6.50)
+        wakuli_price_per_kg = market_price_per_kg * (1 + farmer_premium)
+        premium_paid = (wakuli_price_per_kg - market_price_per_kg) * kg_coffee * direct_trade_pct
+        compostable_pct = min(0.98, 0.75 + 0.002 * months_since_start)
+        co2_per_cup = max(55, 85 - 0.15 * months_since_start + rng.uniform(-3, 3))
+
+        # Cups served (avg ~200g per kg for espresso drinks)
+        cups_served = int(kg_coffee * 1000 / 18)  # ~18g per double shot
+
+        rows.append({
+            'year': year,
+            'month': f'{year}-{month:02d}',
+            'kg_coffee_sourced': round(kg_coffee, 1),
+            'direct_trade_pct': round(direct_trade_pct, 3),
+            'farmers_supported': farmers_supported,
+            'farmer_premium_pct': round(farmer_premium, 3),
+            'market_price_per_kg': round(market_price_per_kg, 2),
+            'wakuli_price_per_kg': round(wakuli_price_per_kg, 2),
+            'premium_paid_eur': round(premium_paid, 2),
+            'compostable_packaging_pct': round(compostable_pct, 3),
+            'co2_per_cup_grams': round(co2_per_cup, 1),
+            'cups_served': cups_served,
+        })
 
     return pd.DataFrame(rows)
 
@@ -377,11 +392,8 @@ def generate_impact_data(selected_years):
 def generate_budget_data():
     """Generate default budget data for all stores."""
     rng = _seed()
-    stores = [c for c in STORE_LOCATIONS if c != "OOH"]
-
     budgets = {}
-    for store in stores:
-        sqm = STORE_LOCATIONS[store].get('sqm', 55)
+    for store, sqm in zip(_STORE_CODES, _STORE_SQM.tolist()):
         budget = round(sqm * rng.uniform(600, 1000), -3)
         budgets[store] = int(budget)
 
@@ -390,15 +402,32 @@ def generate_budget_data():
 
 
 def generate_all_demo_data(selected_years):
-    """Generate all demo datasets and return as a dict."""
-    revenue_df = generate_revenue_data(selected_years)
-    cost_df = generate_cost_data(revenue_df)
-    customer_df = generate_customer_data(revenue_df)
-    labor_df = generate_labor_data(revenue_df)
-    inventory_df = generate_inventory_data(selected_years)
+    """Generate all demo datasets and return as a dict.
+
+    The generators are seeded, so the result depends only on the years and
+    the current month (future months are skipped). It is memoized on both;
+    each call gets its own dict, but the DataFrames inside are shared
+    between calls and must not be modified in place.
+    """
+    now = datetime.now()
+    demo = _generate_all_demo_data_cached(tuple(selected_years), (now.year, now.month))
+    return {**demo, 'budgets': dict(demo['budgets'])}
+
+
+@lru_cache(maxsize=8)
+def _generate_all_demo_data_cached(years_tuple, current_month):
+    """Memoized body of generate_all_demo_data. current_month is only part
+    of the cache key."""
+    revenue_df = generate_revenue_data(years_tuple)
+    monthly_rev = _monthly_revenue(revenue_df)
+    cost_df = generate_cost_data(revenue_df, monthly_rev)
+    # Narrowed here, inside the cache, so reruns don't repeat it
+    customer_df = _downcast_numeric(generate_customer_data(revenue_df, monthly_rev))
+    labor_df = generate_labor_data(revenue_df, monthly_rev)
+    inventory_df = _downcast_numeric(generate_inventory_data(years_tuple))
     investment_df = generate_investment_data()
-    impact_df = generate_impact_data(selected_years)
-    capex_df = generate_capex_data(selected_years)
+    impact_df = generate_impact_data(years_tuple)
+    capex_df = generate_capex_data(years_tuple)
     budgets = generate_budget_data()
 
     return {
@@ -280,7 +280,7 @@ def calculate_revenue_by_period(revenue_df, period='month'):
         revenue_df = revenue_df.copy()
         revenue_df['period'] = revenue_df['month']
 
-    return revenue_df.groupby('period')['revenue'].sum().reset_index().sort_values('period')
+    return revenue_df.groupby('period')['revenue'].sum().reset_index()
 
 
 # ──────────────────────────────────────────────
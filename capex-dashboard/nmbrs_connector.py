@@ -29,6 +29,7 @@ import streamlit as st
 import pandas as pd
 import os
 from datetime import datetime
+from functools import lru_cache
 from config import (
     STORE_LOCATIONS, APP_CONFIG,
     NMBRS_CONFIG, NMBRS_DEPARTMENT_TO_STORE,
@@ -108,14 +109,27 @@ def is_nmbrs_configured():
 # EMPLOYEE DATA
 # ──────────────────────────────────────────────
 
+# NMBRS_DEPARTMENT_TO_STORE keys normalized once (stripped, lower-cased) for
+# the case-insensitive lookup and the substring fallback
+_DEPARTMENT_KEYS_LOWER = tuple(
+    (key.strip().lower(), store_code) for key, store_code in NMBRS_DEPARTMENT_TO_STORE.items()
+)
+_DEPARTMENT_BY_LOWER = {}
+for _key_lower, _store_code in _DEPARTMENT_KEYS_LOWER:
+    _DEPARTMENT_BY_LOWER.setdefault(_key_lower, _store_code)
+
+
+@lru_cache(maxsize=256)
 def _resolve_store_from_department(department_name, cost_center=None):
     """Map an Nmbrs department or cost center to a Wakuli store code.
 
     Checks NMBRS_DEPARTMENT_TO_STORE for:
       1. Exact department name match
       2. Exact cost center match
-      3. Substring match on department name
-    Falls back to "OOH" (overhead) if no mapping found.
+      3. Case/whitespace-insensitive department name match
+      4. Substring match on department name
+    Falls back to "OOH" (overhead) if no mapping found. Memoized: a company's
+    employees share a handful of departments.
     """
     mapping = NMBRS_DEPARTMENT_TO_STORE
 
@@ -127,11 +141,17 @@ def _resolve_store_from_department(department_name, cost_center=None):
     if cost_center and cost_center in mapping:
         return mapping[cost_center]
 
-    # Substring match (e.g. "Linnaeusstraat" in "Store - Linnaeusstraat")
-    if department_name:
-        dept_lower = department_name.lower()
-        for key, store_code in mapping.items():
-            if key.lower() in dept_lower or dept_lower in key.lower():
+    # A whitespace-only name normalizes to "", which is a substring of every
+    # key; it must fall through to OOH rather than match the first store.
+    dept_lower = department_name.strip().lower() if department_name else ""
+    if dept_lower:
+        # Same name with different casing or stray whitespace
+        if dept_lower in _DEPARTMENT_BY_LOWER:
+            return _DEPARTMENT_BY_LOWER[dept_lower]
+
+        # Substring match (e.g. "Linnaeusstraat" in "Store - Linnaeusstraat")
+        for key_lower, store_code in _DEPARTMENT_KEYS_LOWER:
+            if key_lower in dept_lower or dept_lower in key_lower:
                 return store_code
 
     return "OOH"
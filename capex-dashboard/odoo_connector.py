@@ -16,13 +16,16 @@ Also provides:
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import xmlrpc.client
 import os
+import sys
+from functools import lru_cache
 from config import (
     RETAIL_HOLDING_ID, ODOO_ID_TO_STORE, STORE_LOCATIONS,
     CAPEX_ACCOUNTS, ACCOUNT_MAP, APP_CONFIG, ODOO_MODULES,
     REVENUE_TO_PRODUCT_CATEGORY, PRODUCT_CATEGORIES,
-    get_category_for_account_code, get_sign_multiplier,
+    get_all_account_codes, get_category_for_account_code,
 )
 
 
@@ -147,10 +150,13 @@ def fetch_analytic_accounts(db, uid, password):
 # GENERIC P&L FETCHER
 # ──────────────────────────────────────────────
 
+@lru_cache(maxsize=None)
 def _build_account_domain(account_codes):
-    """Build Odoo domain filter for a list of account code patterns.
+    """Build Odoo domain filter for a tuple of account code patterns.
 
     Supports both exact codes ("800000") and prefix patterns ("8%").
+    The section code tuples are static, so each domain is compiled once;
+    callers concatenate it into a fresh list and must not mutate it.
     """
     if not account_codes:
         return []
@@ -189,18 +195,24 @@ def _build_year_domain(years):
     return domain
 
 
+# analytic_distribution keys arrive as strings ("17046"); index the store map
+# by both the int and its string form so each key is a single dict probe
+# instead of an int() parse wrapped in try/except.
+_ANALYTIC_KEY_TO_STORE = {
+    **ODOO_ID_TO_STORE,
+    **{str(odoo_id): code for odoo_id, code in ODOO_ID_TO_STORE.items()},
+}
+
+
 def _resolve_store_code(analytic_dist):
     """Resolve a store code from the analytic_distribution dict."""
     if not analytic_dist:
         return "OOH"
 
-    for analytic_id_str, _pct in analytic_dist.items():
-        try:
-            analytic_id = int(analytic_id_str)
-            if analytic_id in ODOO_ID_TO_STORE:
-                return ODOO_ID_TO_STORE[analytic_id]
-        except (ValueError, TypeError):
-            continue
+    for analytic_key in analytic_dist:
+        store_code = _ANALYTIC_KEY_TO_STORE.get(analytic_key)
+        if store_code is not None:
+            return store_code
     return "OOH"
 
 
@@ -213,9 +225,48 @@ def _extract_account_code(account_id_field):
         return ""
     if len(account_id_field) < 2:
         return ""
-    # Format is typically "800000 Coffee Sales" — extract the code part
+    # Format is typically "800000 Coffee Sales" — extract the code part.
+    # Interned so lookups against the (interned) ACCOUNT_MAP literals and the
+    # lru_cache key compare by identity.
     name_str = str(account_id_field[1])
-    return name_str.split()[0] if name_str else ""
+    return sys.intern(name_str.split()[0]) if name_str.strip() else ""
+
+
+_STORE_NAMES = {code: info['name'] for code, info in STORE_LOCATIONS.items()}
+
+
+def many2one_part(field, idx):
+    """Pick part idx (0 = id, 1 = name) of a column of Odoo many2one values.
+
+    Many2one fields come back as [id, name] or False; missing parts are null.
+    """
+    return field.map(lambda v: v[idx] if isinstance(v, (list, tuple)) and len(v) > idx else None)
+
+
+_ACCOUNT_TAG_COLUMNS = ['account_code', 'section', 'cost_category', 'label', 'group', 'sign_mult']
+
+
+def _tag_account_lines(account_ids, section):
+    """Classify a column of account_id fields against ACCOUNT_MAP.
+
+    A pull has thousands of lines but only a few dozen distinct accounts, so
+    each distinct account is looked up once and the result broadcast back.
+    Returns a frame aligned with account_ids; unmapped accounts have a null
+    cost_category and sign_mult 0.
+    """
+    codes, account_names = pd.factorize(many2one_part(account_ids, 1))
+    records = []
+    # Missing account_id fields (factorize code -1) go in the last slot
+    for name in [*account_names, None]:
+        raw_code = _extract_account_code([None, name]) if name is not None else ""
+        sec, cat_key, entry = get_category_for_account_code(raw_code, section)
+        if entry is None:
+            records.append((raw_code, None, None, None, None, 0))
+        else:
+            records.append((raw_code, sec, cat_key, entry.label, entry.group, entry.sign_mult))
+    table = pd.DataFrame.from_records(records, columns=_ACCOUNT_TAG_COLUMNS)
+    codes[codes < 0] = len(account_names)
+    return table.iloc[codes].set_axis(account_ids.index)
 
 
 @st.cache_data(ttl=APP_CONFIG["cache_ttl_data"])
@@ -242,9 +293,7 @@ def fetch_pl_data(db, uid, password, section, years_tuple):
         return pd.DataFrame()
 
     # Collect all account codes for this section
-    all_codes = []
-    for entry in section_config.values():
-        all_codes.extend(entry["codes"])
+    all_codes = get_all_account_codes(section)
 
     if not all_codes:
         return pd.DataFrame()
@@ -274,57 +323,46 @@ def fetch_pl_data(db, uid, password, section, years_tuple):
         if not lines:
             return pd.DataFrame()
 
-        data = []
-        for line in lines:
-            raw_code = _extract_account_code(line.get('account_id'))
-            matched_section, cat_key, entry = get_category_for_account_code(raw_code, section)
-
-            if not entry:
-                # Account code not in our map — skip
-                continue
-
-            # Calculate amount based on sign convention
-            sign = entry.get("sign", "abs")
-            balance = line.get('balance', 0) or 0
-            debit = line.get('debit', 0) or 0
-            credit = line.get('credit', 0) or 0
-
-            if sign == "credit":
-                amount = credit - debit  # positive for revenue
-            elif sign == "debit":
-                amount = debit - credit  # positive for expenses
-            else:
-                amount = abs(balance or (debit - credit))
-
-            if amount == 0:
-                continue
-
-            store_code = _resolve_store_code(line.get('analytic_distribution'))
-
-            move_id_field = line.get('move_id', [None, ''])
-            move_db_id = move_id_field[0] if move_id_field else None
-            move_name = (move_id_field[1] if move_id_field and len(move_id_field) > 1
-                         else (line.get('move_name', '') or ''))
-
-            data.append({
-                'date': line['date'],
-                'year': int(line['date'][:4]),
-                'month': line['date'][:7],
-                'amount': round(amount, 2),
-                'description': line.get('name', '') or '',
-                'account_code': raw_code,
-                'account_label': entry["label"],
-                'cost_category': cat_key,
-                'cost_label': entry["label"],
-                'store_code': store_code,
-                'store_name': STORE_LOCATIONS.get(store_code, {}).get('name', store_code),
-                'move_id': move_db_id,
-                'move_name': move_name,
-                'section': matched_section,
-                'group': entry.get("group", section),
-            })
-
-        return pd.DataFrame(data)
+        lines_df = pd.DataFrame.from_records(lines)
+        tags = _tag_account_lines(lines_df['account_id'], section)
+
+        # Calculate amount based on sign convention: -1 gives credit - debit
+        # (positive for revenue), +1 gives debit - credit (positive for
+        # expenses), 0 means use the absolute balance.
+        money = lines_df[['debit', 'credit', 'balance']].astype(float).fillna(0)
+        net = (money['debit'] - money['credit']).to_numpy()
+        balance = money['balance'].to_numpy()
+        sign_mult = tags['sign_mult'].to_numpy()
+        amount = np.where(sign_mult != 0, sign_mult * net,
+                          np.abs(np.where(balance != 0, balance, net)))
+
+        # Drop lines whose account code is not in our map, and zero amounts
+        keep = tags['cost_category'].notna().to_numpy() & (amount != 0)
+        if not keep.any():
+            return pd.DataFrame()
+        lines_df, tags, amount = lines_df[keep], tags[keep], amount[keep]
+
+        store_code = lines_df['analytic_distribution'].map(_resolve_store_code)
+        move_id_field = lines_df['move_id']
+        move_name_fallback = lines_df['move_name'].replace({False: None}).fillna('')
+
+        return pd.DataFrame({
+            'date': lines_df['date'],
+            'year': lines_df['date'].str[:4].astype(int),
+            'month': lines_df['date'].str[:7],
+            'amount': [round(a, 2) for a in amount.tolist()],
+            'description': lines_df['name'].replace({False: None}).fillna(''),
+            'account_code': tags['account_code'],
+            'account_label': tags['label'],
+            'cost_category': tags['cost_category'],
+            'cost_label': tags['label'],
+            'store_code': store_code,
+            'store_name': store_code.map(_STORE_NAMES).fillna(store_code),
+            'move_id': many2one_part(move_id_field, 0),
+            'move_name': many2one_part(move_id_field, 1).fillna(move_name_fallback),
+            'section': tags['section'],
+            'group': tags['group'],
+        }).reset_index(drop=True)
 
     except Exception as e:
         st.error(f"Error fetching {section} data from Odoo: {e}")
@@ -389,12 +427,10 @@ def fetch_capex_actuals(db, uid, password, account_codes_tuple, years_tuple):
     if full_capex.empty:
         return pd.DataFrame()
 
-    # Filter to requested account codes
-    requested = set(account_codes_tuple)
-    mask = full_capex['account_code'].apply(
-        lambda c: any(c.startswith(r.rstrip('%')) for r in requested)
-    )
-    return full_capex[mask]
+    # Filter to requested account codes: strip the =like wildcards once and
+    # test all prefixes per code in a single vectorized startswith.
+    prefixes = tuple({code.rstrip('%') for code in account_codes_tuple})
+    return full_capex[full_capex['account_code'].str.startswith(prefixes)]
 
 
 # ──────────────────────────────────────────────
@@ -538,8 +574,12 @@ def fetch_employees(db, uid, password):
 # ──────────────────────────────────────────────
 
 @st.cache_data(ttl=APP_CONFIG["cache_ttl_data"])
-def fetch_invoice_details(db, uid, password, move_id):
-    """Fetch full invoice / journal entry details for a given move_id."""
+def fetch_invoice_details(db, uid, _password, move_id):
+    """Fetch full invoice / journal entry details for a given move_id.
+
+    The leading underscore keeps the password out of the st.cache_data key;
+    entries are keyed on (db, uid, move_id) only.
+    """
     if not uid or not move_id:
         return None, []
 
@@ -547,7 +587,7 @@ def fetch_invoice_details(db, uid, password, move_id):
         models = _get_odoo_models_proxy()
 
         moves = models.execute_kw(
-            db, uid, password, 'account.move', 'search_read',
+            db, uid, _password, 'account.move', 'search_read',
             [[['id', '=', move_id]]],
             {'fields': ['name', 'date', 'ref', 'partner_id', 'state',
                          'amount_total', 'move_type', 'invoice_date',
@@ -557,7 +597,7 @@ def fetch_invoice_details(db, uid, password, move_id):
         move = moves[0] if moves else None
 
         lines = models.execute_kw(
-            db, uid, password, 'account.move.line', 'search_read',
+            db, uid, _password, 'account.move.line', 'search_read',
             [[['move_id', '=', move_id]]],
             {'fields': ['name', 'account_id', 'debit', 'credit', 'balance',
                          'analytic_distribution', 'date', 'quantity',
@@ -573,7 +613,7 @@ def fetch_invoice_details(db, uid, password, move_id):
 
 
 @st.cache_data(ttl=APP_CONFIG["cache_ttl_data"])
-def fetch_invoice_pdf(db, uid, password, move_id):
+def fetch_invoice_pdf(db, uid, _password, move_id):
     """Fetch the PDF attachment for an invoice/move."""
     if not uid or not move_id:
         return None
@@ -581,7 +621,7 @@ def fetch_invoice_pdf(db, uid, password, move_id):
     try:
         models = _get_odoo_models_proxy()
         attachments = models.execute_kw(
-            db, uid, password, 'ir.attachment', 'search_read',
+            db, uid, _password, 'ir.attachment', 'search_read',
             [[['res_model', '=', 'account.move'],
               ['res_id', '=', move_id],
               ['mimetype', '=like', '%pdf%']]],
@@ -603,9 +643,7 @@ def check_data_availability(db, uid, password, years_tuple):
     """
     results = {}
     for section in ACCOUNT_MAP:
-        codes = []
-        for entry in ACCOUNT_MAP[section].values():
-            codes.extend(entry["codes"])
+        codes = get_all_account_codes(section)
 
         configured = len(codes) > 0
         has_data = False
@@ -140,6 +140,12 @@ def get_brand_css():
         flex: 1;
         min-width: 160px;
     }
+    /* metric_row / impact_row: one equal-width column per card */
+    .metric-row {
+        display: grid;
+        grid-template-columns: repeat(auto-fit, minmax(140px, 1fr));
+        gap: 1rem;
+    }
 
     /* ── Impact Cards (Mission Metrics) ── */
     .impact-card {